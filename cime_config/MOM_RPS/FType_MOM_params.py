@@ -1,15 +1,42 @@
 import os
 import re
+import json
 from collections import OrderedDict
+from copy import deepcopy
 
 from CIME.ParamGen.paramgen import ParamGen
+from template_compiler import CompiledReduction
+from template_cache import CachedTemplate
+from case_resolver import CaseResolver
+from param_record import ParamRecord, DescriptionColumn, intern_name, values_equal
 
 
-class FType_MOM_params(ParamGen):
+class FType_MOM_params(CachedTemplate, CompiledReduction, ParamGen):
     """Encapsulates data and read/write methods for MOM6 case parameter files: MOM_input, user_nl."""
 
     supported_formats_out = ["MOM_input", "MOM_override"]
 
+    # Expandable variables whose values differ between the instances of a multi-instance case.
+    instance_vars = ["INST_SUFFIX"]
+
+    # Descriptions of the parameters of the JSON template this object was loaded from, if any,
+    # collected when loading the template, so that the records don't need to hold them.
+    _template_descriptions = None
+
+    # Index of the modules that each parameter name is defined in (see get), maintained on read,
+    # reduce, and append, or built on demand. Must be rebuilt if _data is modified otherwise.
+    _index = None
+
+    @classmethod
+    def from_json(cls, input_path, match="last", cache_dir=None, grid=None):
+        """Loads a JSON template (e.g., MOM_input.json), via its binary cache in cache_dir, if given,
+        and as its shard for grid, if given. Once reduced, the descriptions of the parameters are
+        kept in a DescriptionColumn collected from the loaded template, rather than in each entry.
+        """
+        obj = super().from_json(input_path, match, cache_dir, grid)
+        obj._template_descriptions = DescriptionColumn.from_template(obj._data)
+        return obj
+
     @classmethod
     def from_MOM_input(cls, input_path):
         """
@@ -24,90 +51,368 @@ class FType_MOM_params(ParamGen):
         """
 
         _data = FType_MOM_params._read_MOM_input(input_path)
-        return FType_MOM_params(_data)
+        obj = FType_MOM_params(_data)
+        obj._build_index()
+        return obj
+
+    # "varname = value" assignments, optionally preceded by the #override keyword and followed by
+    # an inline comment. The value must not be empty or start with a comment.
+    _assignment_re = re.compile(
+        r"(?:#override\s+)?(\w*)\s*=\s*([^\s!][^!]*?)\s*(?:!.*)?", re.DOTALL
+    )
+    _whitespace_re = re.compile(r"\s+")
 
     @staticmethod
     def _read_MOM_input(input_path):
         """Reads in input files in MOM_input syntax. Note that this method may be used to
         read in MOM_override and user_nl_mom too, since the syntax is the same, but
-        write methods for MOM_input and MOM_override are different."""
+        write methods for MOM_input and MOM_override are different.
+
+        The file is read in a single pass, where each (stripped) line is either skipped (blank
+        lines, comment lines, and comment blocks), opens or closes a module block, or is parsed
+        as an assignment. Errors report the line number of the faulty line."""
 
         _data = OrderedDict()
+        within_comment_block = False
+        curr_module = "Global"
+        module_lineno = None  # line number of the opening of the current module block
+        comment_lineno = None  # line number of the opening of the current comment block
+        params = None  # parameters of the current module, once added
+        parse_assignment = FType_MOM_params._parse_assignment
+
         with open(input_path, "r") as param_file:
-            within_comment_block = False
-            curr_module = "Global"
-            for line in param_file:
+            for lineno, line in enumerate(param_file, 1):
                 line = line.strip()
-                if len(line) > 1:
-                    line_s = line.split()
+                if len(line) < 2:
+                    continue
+
+                # comment blocks:
+                if within_comment_block or line[:2] == "/*":
+                    if not within_comment_block:
+                        within_comment_block, comment_lineno = True, lineno
+                    if line[-2:] == "*/":
+                        within_comment_block = False
+                    continue
+
+                # single comment lines:
+                first = line[0]
+                if first == "!":
+                    continue
+
+                # module blocks:
+                if curr_module == "Global" and line[-1] == "%":
+                    curr_module, module_lineno = intern_name(line[:-1]), lineno
+                    params = _data.get(curr_module)
+                    continue
+                if curr_module != "Global" and first == "%":
+                    curr_module = "Global"
+                    params = _data.get(curr_module)
+                    continue
+
+                # assignments:
+                parsed = parse_assignment(line)
+                if parsed is None:
+                    raise SystemExit(
+                        f"ERROR: Cannot parse the following line ({input_path}, line "
+                        f"{lineno}): {line}"
+                    )
+                varname, val_str = parsed
+
+                # add this module if not added before:
+                if params is None:
+                    params = _data[curr_module] = dict()
+
+                # check if param already provided:
+                if varname in params:
+                    raise SystemExit(
+                        f"ERROR: {varname} listed more than once in {input_path} (line "
+                        f"{lineno})"
+                    )
+
+                # enter the parameter in the dictionary:
+                params[intern_name(varname)] = ParamRecord(val_str)
+
+        # Check if there is unclosed block:
+        if within_comment_block:
+            raise SystemExit(
+                f"ERROR: faulty comment block in {input_path}! The comment block opened at "
+                f"line {comment_lineno} is not closed."
+            )
+        if curr_module != "Global":
+            raise SystemExit(
+                f"ERROR: faulty module block in {input_path}! The {curr_module} module block "
+                f"opened at line {module_lineno} is not closed."
+            )
 
-                    # check if within comment block.
-                    if (not within_comment_block) and line.strip()[0:2] == "/*":
-                        within_comment_block = True
+        return _data
 
-                    if within_comment_block and line.strip()[-2:] == "*/":
-                        within_comment_block = False
+    @staticmethod
+    def _parse_assignment(line):
+        """Parses a (stripped) "varname = value" line, optionally preceded by the #override
+        keyword and followed by an inline comment. Returns the variable name and the value string,
+        with the whitespace within the value collapsed to single spaces, or None if the line is
+        not an assignment."""
+        m = FType_MOM_params._assignment_re.fullmatch(line)
+        if m is None:
+            return None
+        varname, val_str = m.groups()
+        return varname, FType_MOM_params._whitespace_re.sub(" ", val_str)
+
+    @staticmethod
+    def _format_value(val):
+        """Returns the string representation of a parameter value as written in MOM_input."""
+        if isinstance(val, float):
+            val_str = "%.16g" % val
+            if ("." not in val_str) and ("e" not in val_str.lower()):
+                val_str += ".0"
+            return val_str
+        return str(val)
+
+    def written_view(self, output_format="MOM_input", def_params=None):
+        """Returns an FType_MOM_params object of the parameters as they would be read back (via
+        from_MOM_input) from the file written by the write method in the given format, i.e., with
+        the values formatted as strings, and without descriptions, None values, and unchanged
+        parameters (in MOM_override format). This allows subsequent buildnml stages to use the
+        written parameters without reading the file back.
+
+        Parameters
+        ----------
+        output_format: str
+            "MOM_input" or "MOM_override".
+        def_params: FType_MOM_params
+            The default parameters (MOM_input) that MOM_override is written against.
+        """
+
+        assert output_format in self.supported_formats_out
+        _data = OrderedDict()
+        for module, params in self._data.items():
+            for var, entry in params.items():
+                val = entry["value"]
+                if output_format == "MOM_input":
+                    if val == None:
                         continue
+                    val_str = FType_MOM_params._format_value(val)
+                else:
+                    # parameters with unchanged values are written as comments
+                    def_entry = def_params.get(var, module)
+                    if def_entry is not None and values_equal(entry, def_entry):
+                        continue
+                    val_str = str(val)
+                parsed = FType_MOM_params._parse_assignment(
+                    f"{var} = {val_str}".strip()
+                )
+                if parsed is None:
+                    continue  # not a valid assignment, e.g., an empty value
+                varname, val_str = parsed
+                _data.setdefault(module, dict())[varname] = ParamRecord(val_str)
 
-                    if (
-                        not within_comment_block and line_s[0][0] != "!"
-                    ):  # not a single comment line either
-                        # check format:
-                        if (curr_module == "Global") and line.strip()[-1] == "%":
-                            curr_module = line.strip()[:-1]
-                        elif curr_module != "Global" and line.strip()[0] == "%":
-                            curr_module = "Global"
-                        else:
-                            # discard override keyword if provided:
-                            if line_s[0] == "#override" and len(line_s) > 1:
-                                line_s = line_s[1:]
-                            line_j = " ".join(line_s)
-
-                            # now parse the line:
-                            if re.search("^\s*\w*\s*=\s*[^ \t\n\r\f\v!]+", line_j):
-                                eq_ix = line_j.index("=")
-                                varname = line_j[:eq_ix].strip()
-                                val_str = line_j[eq_ix + 1 :].strip()
-                                if "!" in val_str:
-                                    val_str = val_str.split("!")[
-                                        0
-                                    ]  # discard the comment in val str, if there is
-
-                                # add this module if not added before:
-                                if not curr_module in _data:
-                                    _data[curr_module] = dict()
-
-                                # check if param already provided:
-                                if varname in _data[curr_module]:
-                                    raise SystemExit(
-                                        "ERROR: "
-                                        + varname
-                                        + " listed more than once in "
-                                        + input_path
-                                    )
-
-                                # enter the parameter in the dictionary:
-                                _data[curr_module][varname] = {"value": val_str}
-                            else:
-                                raise SystemExit(
-                                    "ERROR: Cannot parse the following line in user_nl_mom: "
-                                    + line
-                                )
-
-            # Check if there is unclosed block:
-            if within_comment_block:
-                raise SystemExit("ERROR: faulty comment block!")
-            if curr_module != "Global":
-                raise SystemExit("ERROR: faulty module block!")
+        return FType_MOM_params(_data)
 
-        return _data
+    @staticmethod
+    def _case_expand_func(case, inst_suffix=""):
+        """Returns the function to infer the values of expandable variables in templates."""
+        return CaseResolver.of(case).expand_func(inst_suffix=inst_suffix)
+
+    def reduce_shared(self, case):
+        """Reduces the parameters that are common to all instances of a case, so that the template
+        is reduced only once in multi-instance cases. The parameters that depend on instance_vars
+        are set aside (in their template form) and their values are set to None until they are
+        resolved for each instance via the for_instance method."""
+
+        self._instance_templates = OrderedDict()
+        pattern = re.compile(r"\$\{?(" + "|".join(self.instance_vars) + r")\b")
+        for module, params in self._data.items():
+            for var, entry in params.items():
+                if isinstance(entry, dict) and pattern.search(json.dumps(entry)):
+                    self._instance_templates.setdefault(module, OrderedDict())[
+                        var
+                    ] = entry
+                    params[var] = dict(entry, value=None)
+
+        self.reduce(FType_MOM_params._case_expand_func(case))
+
+    def for_instance(self, case, inst_suffix=""):
+        """Returns a reduced copy of this object for the given instance. Must be called after
+        reduce_shared. The copy shares the common parameter entries with this object (which are
+        not to be modified) and only the instance-specific entries are reduced anew.
+
+        Parameters
+        ----------
+        case: Case
+            The case object to infer the values of expandable variables from.
+        inst_suffix: str
+            Instance suffix, e.g., "_0001", or "" for single-instance cases.
+        """
+
+        assert self._reduced and hasattr(
+            self, "_instance_templates"
+        ), "Must call reduce_shared before for_instance"
+
+        instance_params = FType_MOM_params(deepcopy(self._instance_templates))
+        instance_params.reduce(FType_MOM_params._case_expand_func(case, inst_suffix))
+
+        _data = OrderedDict(
+            (module, params.copy()) for module, params in self._data.items()
+        )
+        for module, params in instance_params.data.items():
+            for var, entry in params.items():
+                _data[module][var] = entry
+
+        clone = FType_MOM_params(_data)
+        clone._reduced = True
+        return clone
+
+    def _set_reduced(self, data):
+        """Stores the reduced parameter entries (see ParamGen.reduce) as compact ParamRecords."""
+        super()._set_reduced(data)
+        self._compact()
+        self._build_index()
+
+    def reduce_affected(self, varnames, expand_func):
+        """Updates the reduced parameters for a change of the given variables (see
+        CompiledReduction.reduce_affected). Entries replaced as a whole are stored as ParamRecords.
+        """
+        changed = super().reduce_affected(varnames, expand_func)
+        if any(len(path) < 3 for path in changed):
+            self._compact()
+            self._build_index()
+        return changed
+
+    def _compact(self):
+        """Replaces the parameter entry dicts with ParamRecords, whose descriptions are stored in a
+        separate DescriptionColumn (that of the template, if known). Entries that are already
+        records, or that have fields other than those of a record, are kept as they are.
+        """
+        descriptions = self._template_descriptions
+        if descriptions is None:
+            descriptions = DescriptionColumn()
+        for module, params in self._data.items():
+            if not isinstance(params, dict):
+                continue
+            module = intern_name(module)
+            for var, entry in params.items():
+                if isinstance(entry, dict):
+                    if self._template_descriptions is not None:
+                        # drop the description, which is in the column of the template
+                        entry = {k: v for k, v in entry.items() if k != "description"}
+                    record = ParamRecord.from_dict(
+                        entry, descriptions, (module, intern_name(var))
+                    )
+                    if record is not None:
+                        params[var] = record
+
+    def append(self, pg_obj):
+        """Appends the parameters of another FType_MOM_params object (e.g., MOM_override to
+        MOM_input). The records of parameters present in both are merged, i.e., the fields of
+        pg_obj take precedence, while the remaining fields (e.g., descriptions) are kept.
+        """
+        for module, params in pg_obj.data.items():
+            if not (
+                isinstance(params, dict) and isinstance(self._data.get(module), dict)
+            ):
+                self._data[module] = params
+                continue
+            old_params = self._data[module]
+            for var, entry in params.items():
+                old = old_params.get(var)
+                if isinstance(old, (dict, ParamRecord)) and isinstance(
+                    entry, (dict, ParamRecord)
+                ):
+                    old_params[var] = ParamRecord.merge(old, entry)
+                elif isinstance(entry, dict):
+                    old_params[var] = ParamRecord.from_dict(entry) or entry
+                else:
+                    old_params[var] = entry
+
+        # update the name index, if already built:
+        if self._index is not None:
+            for module, params in pg_obj.data.items():
+                for var in params if isinstance(params, dict) else ():
+                    modules = self._index.setdefault(var, [])
+                    if module not in modules:
+                        modules.append(module)
+
+    def _build_index(self):
+        """Builds the index of the modules that each parameter name is defined in."""
+        self._index = {}
+        for module, params in self._data.items():
+            for var in params if isinstance(params, dict) else ():
+                self._index.setdefault(var, []).append(module)
+        return self._index
+
+    def modules_of(self, name):
+        """Returns the list of modules (including "Global") that the parameter name is defined in."""
+        index = self._index if self._index is not None else self._build_index()
+        return index.get(name, [])
+
+    def ambiguous_names(self):
+        """Returns a dict of the parameter names defined in more than one module, mapped to the
+        lists of modules they are defined in."""
+        index = self._index if self._index is not None else self._build_index()
+        return {name: modules for name, modules in index.items() if len(modules) > 1}
+
+    def get(self, name, module=None, default=None):
+        """Returns the record of a parameter, or default if the parameter is not set.
+
+        Parameters
+        ----------
+        name: str
+            Name of the parameter.
+        module: str
+            Module to look the parameter up in, e.g., "Global" or "KPP". If None, the parameter is
+            looked up in all modules via the name index. A parameter in "Global" takes precedence
+            over those in module blocks. Otherwise, the name must not be defined in more than one
+            module (see ambiguous_names), in which case RuntimeError is raised.
+        default:
+            The value to return if the parameter is not set.
+        """
+        if module is not None:
+            return self._data.get(module, {}).get(name, default)
+        modules = self.modules_of(name)
+        if len(modules) == 0:
+            return default
+        if "Global" in modules:
+            module = "Global"
+        elif len(modules) == 1:
+            module = modules[0]
+        else:
+            raise RuntimeError(
+                f"{name} is ambiguous, as it is set in modules {', '.join(modules)}. "
+                "Must specify the module to look it up in."
+            )
+        return self._data[module][name]
 
     def write(
-        self, output_path, output_format, case=None, def_params=None, inst_suffix=""
+        self,
+        output_path,
+        output_format,
+        case=None,
+        def_params=None,
+        inst_suffix="",
+        descriptions=True,
     ):
+        """Writes the parameters in the given format. The file is rendered in memory and published
+        in a single write to a temporary file that is then renamed to output_path, so that output
+        files are never left half-written, e.g., when buildnml is interrupted.
+
+        Parameters
+        ----------
+        output_path: str
+            Path to the file to write.
+        output_format: str
+            "MOM_input" or "MOM_override".
+        case: Case
+            The case object to infer the values of expandable variables from (MOM_input only).
+        def_params: FType_MOM_params
+            The default parameters (MOM_input) that MOM_override is written against.
+        inst_suffix: str
+            Instance suffix (MOM_input only).
+        descriptions: bool
+            If False, parameter descriptions are omitted for a compact output (MOM_input only).
+        """
         if output_format == "MOM_input":
             assert case != None, "Must provide a case object to write out MOM_input"
-            self._write_MOM_input(output_path, case, inst_suffix)
+            self._write_MOM_input(output_path, case, inst_suffix, descriptions)
         elif output_format == "MOM_override":
             assert (
                 not inst_suffix
@@ -117,20 +422,34 @@ class FType_MOM_params(ParamGen):
             ), "Must provide a def_params object to write out MOM_override"
             self._write_MOM_override(output_path, def_params)
 
-    def _write_MOM_input(self, output_path, case, inst_suffix=""):
+    @staticmethod
+    def _publish(output_path, text):
+        """Writes text to output_path atomically, via a temporary file in the same directory."""
+        output_path = os.fspath(output_path)
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _write_MOM_input(self, output_path, case, inst_suffix="", descriptions=True):
         """writes a MOM_input file from a given json or yaml parameter file in accordance with
         the guards and additional parameters that are passed."""
 
-        # From the general template (MOM_input.yaml), reduce a custom MOM_input for this case
-        def expand_func(varname):
-            if varname == "INST_SUFFIX":
-                return inst_suffix
-            else:
-                return case.get_value(varname)
-
-        self.reduce(expand_func)
+        # From the general template (MOM_input.yaml), reduce a custom MOM_input for this case,
+        # unless already reduced, e.g., via reduce_shared and for_instance.
+        if not self._reduced:
+            self.reduce(FType_MOM_params._case_expand_func(case, inst_suffix))
 
         # 2. Now, write MOM_input
+        self._publish(output_path, "".join(self._render_MOM_input(descriptions)))
+
+    def _render_MOM_input(self, descriptions=True):
+        """Generates the chunks of text of a MOM_input file."""
 
         MOM_input_header = """/* WARNING: DO NOT EDIT this file. Any changes you make will be
         overriden. To make changes in MOM6 parameters within CESM
@@ -143,87 +462,79 @@ class FType_MOM_params(ParamGen):
         corresponding MOM_parameter_doc.all file which is generated
         by the model at runtime. */\n\n"""
 
-        with open(os.path.join(output_path), "w") as MOM_input:
+        yield MOM_input_header
 
-            MOM_input.write(MOM_input_header)
+        tab = " " * 32
+        for module, params in self._data.items():
 
-            tab = " " * 32
-            for module in self._data:
+            # Begin module block:
+            if module != "Global":
+                yield module + "%\n"
 
-                # Begin module block:
-                if module != "Global":
-                    MOM_input.write(module + "%\n")
+            for var, entry in params.items():
+                val = entry["value"]
+                if val == None:
+                    continue
 
-                for var in self._data[module]:
-                    val = self._data[module][var]["value"]
-                    if val == None:
-                        continue
+                # "variable = value" pair
+                val_str = FType_MOM_params._format_value(val)
+                yield var + " = " + val_str + "\n"
+                if not descriptions:
+                    continue
 
-                    # write "variable = value" pair
-                    if isinstance(val, float):
-                        val_str = "%.16g" % val
-                        if ("." not in val_str) and ("e" not in val_str.lower()):
-                            val_str += ".0"
-                        MOM_input.write(var + " = " + val_str + "\n")
-                    else:
-                        MOM_input.write(var + " = " + str(val) + "\n")
+                # the variable description:
+                var_comments = entry["description"].split("\n")
+                if len(var_comments[-1]) == 0:
+                    var_comments.pop()
+                for line in var_comments:
+                    yield tab + "! " + line + "\n"
+                yield "\n"
 
-                    # Write the variable description:
-                    var_comments = self._data[module][var]["description"].split("\n")
-                    if len(var_comments[-1]) == 0:
-                        var_comments.pop()
-                    for line in var_comments:
-                        MOM_input.write(tab + "! " + line + "\n")
-                    MOM_input.write("\n")
-
-                # End module block:
-                if module != "Global":
-                    MOM_input.write("%" + module + "\n")
+            # End module block:
+            if module != "Global":
+                yield "%" + module + "\n"
 
     def _write_MOM_override(self, output_path, def_params):
+        self._publish(output_path, "".join(self._render_MOM_override(def_params)))
+
+    def _render_MOM_override(self, def_params):
+        """Generates the chunks of text of a MOM_override file."""
 
         MOM_override_header = """/* WARNING: DO NOT EDIT this file! Any user changes made in files
         in RUNDIR will be overriden. This file is automatically generated.
         MOM6 parameter changes may ve made via SourceMods or user_nl_mom
         within CASEROOT.*/\n"""
 
-        with open(os.path.join(output_path), "w") as MOM_override:
-
-            MOM_override.write(MOM_override_header)
+        yield MOM_override_header
 
-            for module in self._data:
-                # Begin module block:
-                if module != "Global":
-                    MOM_override.write("\n" + module + "%\n")
+        for module, params in self._data.items():
+            # Begin module block:
+            if module != "Global":
+                yield "\n" + module + "%\n"
 
-                for var in self._data[module]:
-                    val = self._data[module][var]["value"]
+            for var, entry in params.items():
+                val = entry["value"]
+                def_entry = def_params.get(var, module)
 
-                    # parameter is provided in both MOM_input and user_nl_mom
-                    if module in def_params.data and var in def_params.data[module]:
+                # parameter is provided in both MOM_input and user_nl_mom
+                if def_entry is not None:
 
-                        # values are different
-                        if val != def_params.data[module][var]["value"]:
-                            MOM_override.write(
-                                "#override {varname} = {value}\n".format(
-                                    varname=var, value=val
-                                )
-                            )
-
-                        # values are the same
-                        else:
-                            MOM_override.write(
-                                "!!! {varname} = {value} !(UNCHANGED)\n".format(
-                                    varname=var, value=val
-                                )
-                            )
+                    # values are different (after normalization, e.g., 1.0 vs 1.)
+                    if not values_equal(entry, def_entry):
+                        yield "#override {varname} = {value}\n".format(
+                            varname=var, value=val
+                        )
 
-                    # parameter is provided only in user_nl_mom
+                    # values are the same
                     else:
-                        MOM_override.write(
-                            "{varname} = {value}\n".format(varname=var, value=val)
+                        yield "!!! {varname} = {value} !(UNCHANGED)\n".format(
+                            varname=var, value=val
                         )
 
-                # End module block:
-                if module != "Global":
-                    MOM_override.write("%" + module + "\n\n")
+                # parameter is provided only in user_nl_mom
+                else:
+                    yield "{varname} = {value}\n".format(varname=var, value=val)
+
+            # End module block:
+            if module != "Global":
+                yield "%" + module + "\n\n"
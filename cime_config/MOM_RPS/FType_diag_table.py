@@ -1,8 +1,11 @@
 import os
 from CIME.ParamGen.paramgen import ParamGen
+from template_compiler import CompiledReduction
+from template_cache import CachedTemplate
+from case_resolver import CaseResolver
 
 
-class FType_diag_table(ParamGen):
+class FType_diag_table(CachedTemplate, CompiledReduction, ParamGen):
     """Encapsulates data and read/write methods for MOM6 diag_table input file."""
 
     @classmethod
@@ -63,16 +66,10 @@ class FType_diag_table(ParamGen):
                         return False
             return True
 
-        def expand_func(varname):
-            val = case.get_value(varname)
-            if val is None:
-                val = MOM_input_final.data["Global"][varname]["value"]
-            if val is None:
-                raise RuntimeError("Cannot determine the value of variable: " + varname)
-            return val
-
-        # From the general template (diag_table.yaml), reduce a custom diag_table for this case
-        self.reduce(expand_func)
+        # From the general template (diag_table.yaml), reduce a custom diag_table for this case,
+        # unless already reduced, e.g., via reduce_many.
+        if not self._reduced:
+            self.reduce(CaseResolver.of(case).expand_func(MOM_input_final))
 
         with open(os.path.join(output_path), "w") as diag_table:
 
@@ -1,21 +1,16 @@
 import os
 from CIME.ParamGen.paramgen import ParamGen
+from template_compiler import CompiledReduction
+from template_cache import CachedTemplate
+from case_resolver import CaseResolver
 
 
-class FType_input_data_list(ParamGen):
+class FType_input_data_list(CachedTemplate, CompiledReduction, ParamGen):
     """Encapsulates data and read/write methods for MOM6 input_data_list file."""
 
     def write(self, output_path, case, MOM_input_final=None):
-        def expand_func(varname):
-            val = case.get_value(varname)
-            if val is None:
-                val = MOM_input_final.data["Global"][varname]["value"]
-            if val is None:
-                raise RuntimeError("Cannot determine the value of variable: " + varname)
-            return val
-
         # From the general template (input_data_list.yaml), reduce a custom input_data_list for this case
-        self.reduce(expand_func)
+        self.reduce(CaseResolver.of(case).expand_func(MOM_input_final))
 
         with open(os.path.join(output_path), "w") as input_data_list:
             for module in self._data:
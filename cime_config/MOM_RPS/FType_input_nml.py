@@ -1,14 +1,19 @@
 import os
 from CIME.ParamGen.paramgen import ParamGen
+from template_compiler import CompiledReduction
+from template_cache import CachedTemplate
+from case_resolver import CaseResolver
 
 
-class FType_input_nml(ParamGen):
+class FType_input_nml(CachedTemplate, CompiledReduction, ParamGen):
     """Encapsulates data and read/write methods for MOM6 (FMS) input.nml file"""
 
     def write(self, output_path, case):
 
-        # From the general template (input_nml.yaml), reduce a custom input.nml for this case
-        self.reduce(lambda varname: case.get_value(varname))
+        # From the general template (input_nml.yaml), reduce a custom input.nml for this case,
+        # unless already reduced, e.g., via reduce_many.
+        if not self._reduced:
+            self.reduce(CaseResolver.of(case).expand_func())
 
         # write the data in namelist format
         self.write_nml(output_path)
@@ -0,0 +1,115 @@
+from contextlib import contextmanager
+
+
+class CaseResolver:
+    """A memoizing resolver of the expandable variables in MOM6 input file templates. Wraps a CIME
+    case object, such that each case variable is looked up only once per buildnml call, and records
+    which case variables and MOM_input_final parameters each output depended on. All other
+    attributes are forwarded to the case object.
+
+    Parameters
+    ----------
+    case: Case
+        The CIME case object to wrap.
+    """
+
+    def __init__(self, case):
+        self._case = case
+        self._values = {}
+        self._dependencies = {}
+        self._output = None
+        self.MOM_params = None  # MOM_input_final, once available
+
+    def __getattr__(self, name):
+        return getattr(self._case, name)
+
+    def _record(self, kind, varname, val):
+        if self._output is not None:
+            self._dependencies[self._output][kind][varname] = val
+
+    def get_value(self, varname, *args, **kwargs):
+        """Returns the (memoized) value of a case variable."""
+        if args or kwargs:
+            return self._case.get_value(varname, *args, **kwargs)
+        if varname not in self._values:
+            self._values[varname] = self._case.get_value(varname)
+        val = self._values[varname]
+        self._record("case_vars", varname, val)
+        return val
+
+    def set_value(self, varname, value, *args, **kwargs):
+        """Sets the value of a case variable, and updates the memoized value."""
+        self._values.pop(varname, None)
+        return self._case.set_value(varname, value, *args, **kwargs)
+
+    def get_MOM_param(self, varname, MOM_params=None):
+        """Returns the value of a MOM6 parameter from MOM_params, which defaults to
+        MOM_input_final, or None if the parameter is not set. (See FType_MOM_params.get)
+        """
+        MOM_params = MOM_params or self.MOM_params
+        entry = MOM_params.get(varname)
+        val = None if entry is None else entry["value"]
+        self._record("MOM_params", varname, val)
+        return val
+
+    def expand_func(self, MOM_params=None, inst_suffix=None):
+        """Returns the function to infer the values of expandable variables in templates with.
+
+        Parameters
+        ----------
+        MOM_params: FType_MOM_params
+            If provided, variables that are not case variables are inferred from these MOM6
+            parameters, e.g., MOM_input_final.
+        inst_suffix: str
+            If provided, the value of the INST_SUFFIX variable.
+        """
+
+        def expand_func(varname):
+            if inst_suffix is not None and varname == "INST_SUFFIX":
+                return inst_suffix
+            val = self.get_value(varname)
+            if val is None and MOM_params is not None:
+                val = self.get_MOM_param(varname, MOM_params)
+                if val is None:
+                    raise RuntimeError(
+                        "Cannot determine the value of variable: " + varname
+                    )
+            return val
+
+        return expand_func
+
+    def record_input_file(self, path):
+        """Records a file read while generating the current output, e.g., the topography file that
+        the mask table is generated from, as an input file of the output."""
+        if self._output is not None:
+            self._dependencies[self._output]["input_files"].append(str(path))
+
+    @contextmanager
+    def recording(self, output):
+        """Within this context, the case variables and MOM6 parameters resolved, and the input files
+        recorded via record_input_file, are recorded as the dependencies of the given output.
+        Dependencies recorded previously are discarded.
+        """
+        self._dependencies[output] = {
+            "case_vars": {},
+            "MOM_params": {},
+            "input_files": [],
+        }
+        prev_output, self._output = self._output, output
+        try:
+            yield self._dependencies[output]
+        finally:
+            self._output = prev_output
+
+    def dependencies(self, output):
+        """Returns the dependencies recorded for the given output as a dict with the keys
+        case_vars and MOM_params, each mapping variable names to the values resolved, and
+        input_files, listing the paths to the input files recorded."""
+        return self._dependencies.get(
+            output, {"case_vars": {}, "MOM_params": {}, "input_files": []}
+        )
+
+    @staticmethod
+    def of(case):
+        """Returns case if it is a CaseResolver, and a CaseResolver wrapping it otherwise."""
+        return case if isinstance(case, CaseResolver) else CaseResolver(case)
@@ -0,0 +1,203 @@
+import os
+import json
+import hashlib
+
+# Incremented whenever the format of the manifest changes, so that older manifests are discarded.
+MANIFEST_VERSION = 3
+
+
+class InputManifest:
+    """Records the content hashes of the inputs of each MOM6 input file generated by buildnml, i.e.,
+    the templates, user_nl_mom files, SourceMods files, and staged files it is generated from, and
+    the values of the case variables and MOM6 parameters resolved while generating it (see
+    CaseResolver). Outputs whose inputs have not changed since the last buildnml call don't need
+    to be regenerated.
+
+    Parameters
+    ----------
+    manifest_path: str
+        Path to the manifest (JSON) file.
+    code_paths: list of str
+        Paths to the source files of the generators. If any of these change, all outputs are
+        considered out of date.
+    force: bool
+        If True, all outputs are considered out of date.
+    """
+
+    def __init__(self, manifest_path, code_paths=(), force=False):
+        self.manifest_path = manifest_path
+        self.force = force
+        self._digests = {}  # file digests computed during this buildnml call
+        self.status = (
+            {}
+        )  # whether each output was regenerated during this call, and why
+
+        manifest = {}
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        if manifest.get("version") != MANIFEST_VERSION:
+            manifest = {}
+
+        # digests from previous calls, keyed by path and reused if the size and mtime match:
+        self._stat_digests = manifest.get("files", {})
+        self.entries = manifest.get("entries", {})
+
+        self.code_digest = self._combined_digest(code_paths)
+        if manifest.get("code") != self.code_digest:
+            self.entries = {}
+
+    def file_digest(self, path):
+        """Returns the SHA-256 digest of a file, or None if the file doesn't exist. The digests
+        are memoized by path, size, and modification time across buildnml calls."""
+        path = os.path.realpath(path)
+        if path in self._digests:
+            return self._digests[path]
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        prev = self._stat_digests.get(path)
+        if prev is not None and prev[:2] == [stat.st_size, stat.st_mtime_ns]:
+            digest = prev[2]
+        else:
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(2**20), b""):
+                    sha.update(block)
+            digest = sha.hexdigest()
+        self._stat_digests[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        self._digests[path] = digest
+        return digest
+
+    def _combined_digest(self, paths):
+        return hashlib.sha256(
+            json.dumps([[str(p), self.file_digest(p)] for p in paths]).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def _normalize(values):
+        # values as they would be read back from the manifest
+        return json.loads(json.dumps(values, sort_keys=True, default=str))
+
+    def _changes(self, name, resolver, input_paths, output_paths):
+        """Returns the reason why the output needs to be regenerated, or None if it doesn't."""
+        entry = self.entries.get(name)
+        if self.force:
+            return "forced"
+        if entry is None:
+            return "no record of a previous generation"
+        inputs = {str(p): self.file_digest(p) for p in input_paths}
+        for path in sorted(set(inputs) | set(entry["inputs"])):
+            if inputs.get(path) != entry["inputs"].get(path):
+                return f"input file changed: {path}"
+        for path, digest in entry["recorded_inputs"].items():
+            if self.file_digest(path) != digest:
+                return f"input file changed: {path}"
+        outputs = {str(p): self.file_digest(p) for p in output_paths}
+        for path in sorted(set(outputs) | set(entry["outputs"])):
+            if outputs.get(path) != entry["outputs"].get(path):
+                return f"output file changed or missing: {path}"
+        for var, val in entry["case_vars"].items():
+            if self._normalize(resolver.get_value(var)) != val:
+                return f"case variable changed: {var}"
+        for var, val in entry["MOM_params"].items():
+            if self._normalize(resolver.get_MOM_param(var)) != val:
+                return f"MOM6 parameter changed: {var}"
+        return None
+
+    def is_current(self, name, resolver, input_paths, output_paths):
+        """Returns True if the output named name was generated from the same inputs by a previous
+        buildnml call, and its output files are unchanged since then.
+
+        Parameters
+        ----------
+        name: str
+            Name of the output, e.g., "MOM_input".
+        resolver: CaseResolver
+            The resolver to obtain the current values of the recorded case variables and MOM6
+            parameters from.
+        input_paths: list of str
+            Paths to the input files of the output. Missing files are allowed.
+        output_paths: list of str
+            Paths to the output files.
+        """
+        reason = self._changes(name, resolver, input_paths, output_paths)
+        self.status[name] = (
+            "up to date" if reason is None else f"regenerated ({reason})"
+        )
+        return reason is None
+
+    def update(self, name, dependencies, input_paths, output_paths):
+        """Records the inputs of a (re)generated output.
+
+        Parameters
+        ----------
+        name: str
+            Name of the output, e.g., "MOM_input".
+        dependencies: dict
+            Dependencies recorded by CaseResolver while generating the output, i.e., names and
+            values of the case variables ("case_vars") and MOM6 parameters ("MOM_params"), and
+            paths to the input files found while generating it ("input_files"), e.g., the
+            topography file of the mask table.
+        input_paths: list of str
+            Paths to the input files of the output.
+        output_paths: list of str
+            Paths to the output files.
+        """
+        for path in output_paths:
+            self._digests.pop(os.path.realpath(path), None)
+        self.entries[name] = {
+            "inputs": {str(p): self.file_digest(p) for p in input_paths},
+            "recorded_inputs": {
+                str(p): self.file_digest(p) for p in dependencies.get("input_files", [])
+            },
+            "outputs": {str(p): self.file_digest(p) for p in output_paths},
+            "case_vars": self._normalize(dependencies.get("case_vars", {})),
+            "MOM_params": self._normalize(dependencies.get("MOM_params", {})),
+        }
+
+    def invalidate(self, name, reason="always regenerated"):
+        """Discards the record of an output, so that it is regenerated by the next call."""
+        self.entries.pop(name, None)
+        self.status[name] = f"regenerated ({reason})"
+
+    def explain(self):
+        """Returns a report of the outputs handled during this buildnml call: whether and why each
+        was regenerated, and the inputs, case variables, and MOM6 parameters it depends on.
+        """
+        lines = []
+        for name, status in self.status.items():
+            lines.append(f"{name}: {status}")
+            entry = self.entries.get(name)
+            if entry is None:
+                continue
+            inputs = dict(entry["inputs"], **entry["recorded_inputs"])
+            for path, digest in inputs.items():
+                if digest is not None:
+                    lines.append(f"    input file:     {path}")
+            for var, val in sorted(entry["case_vars"].items()):
+                lines.append(f"    case variable:  {var} = {val}")
+            for var, val in sorted(entry["MOM_params"].items()):
+                lines.append(f"    MOM6 parameter: {var} = {val}")
+        return "\n".join(lines)
+
+    def save(self):
+        """Writes the manifest file."""
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "code": self.code_digest,
+            # only keep the digests of the files checked during this buildnml call
+            "files": {
+                path: self._stat_digests[path]
+                for path in self._digests
+                if path in self._stat_digests
+            },
+            "entries": self.entries,
+        }
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
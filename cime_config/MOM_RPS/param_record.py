@@ -0,0 +1,307 @@
+import re
+import sys
+
+
+_int_re = re.compile(r"[+-]?\d+")
+_real_re = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eEdD][+-]?\d+)?")
+_array_item_re = re.compile(r"\"[^\"]*\"|'[^']*'|[^,]+")
+_logicals = {
+    "true": True,
+    "t": True,
+    ".true.": True,
+    "false": False,
+    "f": False,
+    ".false.": False,
+}
+
+
+def _is_quoted(val_str):
+    return len(val_str) > 1 and val_str[0] == val_str[-1] and val_str[0] in "\"'"
+
+
+def _parse_scalar(val_str):
+    val_str = val_str.strip()
+    if _is_quoted(val_str):
+        val_str = val_str[1:-1].strip()
+    logical = _logicals.get(val_str.lower())
+    if logical is not None:
+        return logical
+    if _int_re.fullmatch(val_str):
+        return int(val_str)
+    if _real_re.fullmatch(val_str):
+        return float(val_str.replace("d", "e").replace("D", "e"))
+    return val_str
+
+
+def parse_value(val):
+    """Parses a MOM6 parameter value (as written in MOM_input) into a typed value: a bool for
+    logicals (True, F, .true., etc.), an int or a float for numbers (including Fortran real
+    literals such as 1., 1.5d-3), a tuple of typed values for comma-separated arrays, and a str
+    otherwise. Quotes around strings (and around other values) are removed. Values that are
+    already typed (e.g., from JSON templates) are returned as they are."""
+    if not isinstance(val, str):
+        return val
+    if "," in val:
+        items = _array_item_re.findall(val)
+        if len(items) > 1:
+            return tuple(_parse_scalar(item) for item in items)
+    return _parse_scalar(val)
+
+
+def normalized(typed):
+    """Returns a normalized form of a typed value (see parse_value) for comparisons, in which
+    logicals don't compare equal to numbers, while ints and floats of the same value do.
+    """
+    if isinstance(typed, tuple):
+        return tuple(normalized(item) for item in typed)
+    if isinstance(typed, bool):
+        return ("logical", typed)
+    if isinstance(typed, (int, float)):
+        return ("number", typed)
+    return ("string", typed)
+
+
+def _normalized_scalar(val_str):
+    val_str = val_str.strip()
+    if _is_quoted(val_str):
+        return ("string", val_str[1:-1].strip())
+    return normalized(_parse_scalar(val_str))
+
+
+def normalized_value(val):
+    """Returns the normalized form (see normalized) of a MOM6 parameter value, as written in
+    MOM_input or typed, for comparisons. Unlike in parse_value, quoted values are strings, as they
+    are in MOM6, e.g., "1" (quoted) is not the same value as 1, while "abc" and abc are.
+    """
+    if not isinstance(val, str):
+        return normalized(val)
+    if "," in val:
+        items = _array_item_re.findall(val)
+        if len(items) > 1:
+            return tuple(_normalized_scalar(item) for item in items)
+    return _normalized_scalar(val)
+
+
+def typed_value(entry):
+    """Returns the typed value of a parameter entry (a ParamRecord, whose typed value is cached,
+    or a dict)."""
+    if isinstance(entry, ParamRecord):
+        return entry.typed_value
+    return parse_value(entry["value"])
+
+
+def values_equal(entry, other):
+    """Returns whether the values of two parameter entries (ParamRecords or dicts) are equal
+    after normalization (see normalized_value), e.g., 1.0 and 1., or True and True as read from
+    MOM_input, but not "1" (quoted) and 1."""
+
+    def _normalized(entry):
+        if isinstance(entry, ParamRecord):
+            return entry.normalized_value
+        return normalized_value(entry["value"])
+
+    return _normalized(entry) == _normalized(other)
+
+
+class DescriptionColumn:
+    """Descriptions of MOM6 parameters keyed by (module, parameter name), stored apart from the
+    parameter records, so that records holding values only remain small. The descriptions of a
+    template are collected once, when the template is loaded (see from_template), and are shared by
+    all records (and instances) reduced from it.
+
+    Parameters
+    ----------
+    descriptions: dict
+        Descriptions keyed by (module, parameter name).
+    """
+
+    __slots__ = ("_descriptions",)
+
+    def __init__(self, descriptions=None):
+        self._descriptions = descriptions if descriptions is not None else {}
+
+    @classmethod
+    def from_template(cls, data):
+        """Returns the column of the descriptions of the parameters in template data (e.g., as
+        loaded from MOM_input.json), which refers to the description strings of the data, i.e.,
+        without copying or parsing them again."""
+        descriptions = {}
+        for module, params in data.items():
+            if not isinstance(params, dict):
+                continue
+            for var, entry in params.items():
+                if isinstance(entry, dict) and isinstance(
+                    entry.get("description"), str
+                ):
+                    descriptions.setdefault(
+                        (intern_name(module), intern_name(var)), entry["description"]
+                    )
+        return cls(descriptions)
+
+    def get(self, key, default=None):
+        return self._descriptions.get(key, default)
+
+    def __setitem__(self, key, description):
+        self._descriptions[key] = description
+
+
+class ParamRecord:
+    """A compact record of a MOM6 parameter with the fields value, description, datatype, and
+    units. The description is looked up from a DescriptionColumn shared by many records. Records
+    behave like the {"value": ..., "description": ...} dicts they replace, i.e., fields can be
+    accessed via record["value"], record.get("units"), "description" in record, etc. Fields that
+    are None are considered missing, except for value.
+
+    Parameters
+    ----------
+    value: str, int, float, bool, or None
+        Value of the parameter.
+    datatype: str
+        Data type of the parameter, e.g., "logical".
+    units: str
+        Units of the parameter.
+    descriptions: DescriptionColumn
+        The column to look the description of the parameter up from.
+    key: tuple
+        The key of the description in the column, i.e., (module, parameter name).
+    """
+
+    __slots__ = ("_value", "_typed", "datatype", "units", "_descriptions", "_key")
+
+    _fields = ("value", "description", "datatype", "units")
+
+    def __init__(self, value, datatype=None, units=None, descriptions=None, key=None):
+        self._value = value
+        self._typed = None  # (typed value, normalized value), parsed lazily
+        self.datatype = datatype
+        self.units = units
+        self._descriptions = descriptions
+        self._key = key
+
+    @classmethod
+    def from_dict(cls, entry, descriptions=None, key=None):
+        """Returns a record of a parameter entry dict, or None if the entry has fields other than
+        those of a record. The description, if any, is stored in the given column."""
+        if not all(field in cls._fields for field in entry):
+            return None
+        if entry.get("description") is not None:
+            if descriptions is None:
+                descriptions = DescriptionColumn()
+            descriptions[key] = entry["description"]
+        return cls(
+            entry.get("value"),
+            entry.get("datatype"),
+            entry.get("units"),
+            descriptions,
+            key,
+        )
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self._typed = None
+
+    @property
+    def typed_value(self):
+        """The value parsed into a typed value (see parse_value), cached once parsed."""
+        if self._typed is None:
+            self._typed = (parse_value(self._value), normalized_value(self._value))
+        return self._typed[0]
+
+    @property
+    def normalized_value(self):
+        """The normalized form of the value (see normalized_value) to compare values with."""
+        if self._typed is None:
+            self.typed_value
+        return self._typed[1]
+
+    @property
+    def description(self):
+        if self._descriptions is None:
+            return None
+        return self._descriptions.get(self._key)
+
+    @staticmethod
+    def merge(old, new):
+        """Returns a new record with the fields of old (a record or dict) updated by those of new
+        (a record or dict). Neither old nor new are modified."""
+        if isinstance(old, ParamRecord):
+            merged = ParamRecord(
+                old._value, old.datatype, old.units, old._descriptions, old._key
+            )
+        else:
+            merged = ParamRecord.from_dict(old)
+            if merged is None:
+                return dict(old, **dict(new.items()))
+        for field, val in new.items():
+            merged[field] = val
+        return merged
+
+    # dict-like interface:
+
+    def keys(self):
+        return [
+            field
+            for field in self._fields
+            if field == "value" or getattr(self, field) is not None
+        ]
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.keys()]
+
+    def values(self):
+        return [getattr(self, field) for field in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, field):
+        return field in self.keys()
+
+    def __getitem__(self, field):
+        if field not in self._fields or (
+            field != "value" and getattr(self, field) is None
+        ):
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def __setitem__(self, field, val):
+        if field == "description":
+            # the column may be shared with other records, so don't modify it:
+            self._descriptions = DescriptionColumn({self._key: val})
+        elif field in self._fields:
+            setattr(self, field, val)
+        else:
+            raise KeyError(f"{field} is not a field of ParamRecord")
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (ParamRecord, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ParamRecord({self.to_dict()!r})"
+
+
+def intern_name(name):
+    """Interns a module or parameter name, so that the many copies of the same names in the
+    parameters of different instances and cases are stored only once."""
+    return sys.intern(name) if isinstance(name, str) else name
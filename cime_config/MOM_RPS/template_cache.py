@@ -0,0 +1,98 @@
+import os
+import re
+import sys
+import json
+import pickle
+from collections import OrderedDict
+
+import template_shards
+
+# Incremented whenever the format of the cache files changes, so that older cache files are rebuilt.
+CACHE_VERSION = 2
+
+
+def cache_path(json_path, cache_dir, grid=None):
+    """Returns the path to the cache file of a JSON template (or of its shard for a grid) in
+    cache_dir for the running Python version, e.g., cache_dir/MOM_input.cpython-311.pickle for
+    MOM_input.json, or cache_dir/MOM_input.tx2_3v2.cpython-311.pickle for its tx2_3v2 shard.
+    """
+    name = os.path.splitext(os.path.basename(os.fspath(json_path)))[0]
+    if grid is not None:
+        name += "." + re.sub(r"[^\w.-]", "_", grid)
+    tag = sys.implementation.cache_tag or "py{}{}".format(*sys.version_info[:2])
+    return os.path.join(cache_dir, f"{name}.{tag}.pickle")
+
+
+def _read_json(json_path):
+    with open(json_path, "r") as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+def _owned(f):
+    """Returns True if the open file f is owned by the current user (or if ownership is unknown)."""
+    return not hasattr(os, "getuid") or os.fstat(f.fileno()).st_uid == os.getuid()
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _load(json_path, grid):
+    data = _read_json(json_path)
+    return data if grid is None else template_shards.shard(data, grid)
+
+
+def load_json(json_path, cache_dir=None, grid=None):
+    """Loads a JSON template (e.g., MOM_input.json) as ParamGen.from_json does, i.e., with
+    OrderedDicts. If a grid is given, the shard of the template for the grid is returned instead
+    (see template_shards.shard), which reduces to the same as the template for cases with that
+    OCN_GRID, but has its guards on OCN_GRID already resolved.
+
+    If a cache directory is given, e.g., Buildconf/momconf/template_cache of a case, the loaded
+    data (or shard) is cached there in binary (pickle) form, so that shards are generated on first
+    use only. The cache is keyed by the size and modification time of the template (and of the
+    sharding code, for shards) and the Python version, and is rebuilt if stale. Cache files not
+    owned by the current user are ignored, and if the cache can't be written, the template is
+    loaded from JSON each time.
+    """
+    if cache_dir is None:
+        return _load(json_path, grid)
+
+    header = (CACHE_VERSION, _stat_key(json_path))
+    if grid is not None:
+        header += (_stat_key(template_shards.__file__),)
+    path = cache_path(json_path, cache_dir, grid)
+    try:
+        with open(path, "rb") as f:
+            if _owned(f) and pickle.load(f) == header:
+                return pickle.load(f)
+    except Exception:
+        # (missing, truncated, or otherwise unreadable cache files are rebuilt)
+        pass
+
+    data = _load(json_path, grid)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return data
+
+
+class CachedTemplate:
+    """Mixin for ParamGen subclasses (the FType_* classes) to load JSON templates via load_json,
+    i.e., from a binary cache in cache_dir, if given, instead of parsing them each time, and as
+    their shards for the grid of the case, if given.
+    """
+
+    @classmethod
+    def from_json(cls, input_path, match="last", cache_dir=None, grid=None):
+        return cls(load_json(input_path, cache_dir, grid), match)
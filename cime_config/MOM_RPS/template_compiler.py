@@ -0,0 +1,449 @@
+import re
+from collections import OrderedDict
+from copy import copy, deepcopy
+
+from CIME.ParamGen.paramgen import ParamGen
+from CIME.ParamGen.paramgen_utils import is_logical_expr, is_formula, eval_formula
+
+# Expandable variables, e.g., $OCN_GRID or ${OCN_GRID}, as matched by ParamGen.
+_var_re = re.compile(r"(\$\w+|\${\w+\})")
+
+# Characters that can't be expanded into a string literal by enclosing them with quotes.
+_unsafe_str_chars = re.compile(r"[\"\\\n\r]")
+
+
+class CompiledGuard:
+    """A guard of a template compiled once: the expandable variables it refers to, and a code
+    object in which the variables are Python names to be bound to their values. The results of the
+    guard are cached by the values of its variables, so that a guard that appears many times in
+    templates (e.g., $OCN_GRID == "tx2_3v3") is evaluated once per distinct set of values.
+
+    Parameters
+    ----------
+    source: str
+        The expression as written in the template.
+    """
+
+    __slots__ = ("source", "words", "varnames", "_code", "_results")
+
+    def __init__(self, source):
+        self.source = source
+        self.words = _var_re.findall(source)
+        self.varnames = []
+        for word in self.words:
+            varname = CompiledGuard._varname(word)
+            if varname not in self.varnames:
+                self.varnames.append(varname)
+
+        # The variables are replaced with placeholder names, to be compiled when first evaluated.
+        # Guards that don't compile this way (e.g., with implicitly concatenated strings) are
+        # expanded textually instead, as are guards with values that don't expand into literals.
+        self._code = _var_re.sub(
+            lambda m: "__var_" + CompiledGuard._varname(m.group()), source
+        )
+        self._results = {}
+
+    @staticmethod
+    def _varname(word):
+        return word.strip().replace("$", "").replace("{", "").replace("}", "")
+
+    def _literal_values(self, values):
+        """Returns the values that the variables are expanded into literals of by ParamGen, or
+        None if any of the values is not expanded into a literal (e.g., strings with quotes, or
+        strings expanded without quotes via ${var}), in which case the expression must be
+        expanded textually instead."""
+        for word in self.words:
+            val = values[CompiledGuard._varname(word)]
+            if isinstance(val, str):
+                if word[1] == "{" or _unsafe_str_chars.search(val):
+                    return None
+            elif isinstance(val, (int, float)):
+                # (negative numbers bind differently, e.g., in -1 ** 2, nan and inf are names)
+                if not (val >= 0 and val != float("inf")):
+                    return None
+            else:
+                return None
+        return values
+
+    def evaluate(self, values):
+        """Returns the value of the guard for the given values of its variables (a dict)."""
+        literal_values = self._literal_values(values)
+        if literal_values is None or self._code is None:
+            return _eval_guard(ParamGen._expand_vars(self.source, values.__getitem__))
+        # (types are part of the key, since, e.g., True == 1)
+        key = tuple((type(literal_values[v]), literal_values[v]) for v in self.varnames)
+        try:
+            return self._results[key]
+        except KeyError:
+            pass
+        if isinstance(self._code, str):
+            try:
+                self._code = compile(self._code, "<guard>", "eval")
+            except SyntaxError:
+                self._code = None
+                return self.evaluate(values)
+        result = eval(
+            self._code, {}, {"__var_" + v: literal_values[v] for v in self.varnames}
+        )
+        assert isinstance(result, bool), "Guard is not boolean: {}".format(self.source)
+        self._results[key] = result
+        return result
+
+
+def _eval_guard(guard):
+    # as in ParamGen._impose_guards
+    if _var_re.search(guard):
+        raise RuntimeError(
+            f"The guard {guard} has an expandable case variable ($var) that couldn't be expanded."
+        )
+    result = eval_formula(guard)
+    assert isinstance(result, bool), "Guard is not boolean: {}".format(guard)
+    return result
+
+
+# Compiled guards by their source, shared by all templates and reductions.
+_compiled = {}
+
+
+def compile_guard(guard):
+    """Returns the (cached) CompiledGuard of a guard."""
+    try:
+        return _compiled[guard]
+    except KeyError:
+        compiled = _compiled[guard] = CompiledGuard(guard)
+        return compiled
+
+
+# Whether (expanded) keys are logical expressions, i.e., guards.
+_is_logical = {}
+
+
+def is_guard(key):
+    """Returns whether an expanded key is a guard (see is_logical_expr), cached by key."""
+    try:
+        return _is_logical[key]
+    except KeyError:
+        result = _is_logical[key] = is_logical_expr(str(key))
+        return result
+
+
+class TemplateReducer:
+    """Reduces template data (see ParamGen.reduce) with the same semantics as ParamGen, but with
+    the guards compiled once (see CompiledGuard) and each expandable variable resolved only once
+    per reduction, i.e., guards are evaluated against a snapshot of the resolved variables.
+
+    Parameters
+    ----------
+    expand_func: function
+        The function to infer the values of expandable variables with.
+    match: str
+        "first" or "last", the guard to pick if multiple guards evaluate to true.
+    """
+
+    def __init__(self, expand_func, match="last"):
+        self._expand_func = expand_func
+        self._match = match
+        self._values = _Snapshot(expand_func)
+        self._expanded = {}  # expanded strings by their source
+
+    def reduce(self, data):
+        """Returns the reduced data."""
+        if self._expand_func is None:
+            # (no expansion: fall back to ParamGen, as guards with variables can't be evaluated.)
+            pg = ParamGen({}, self._match)
+            return pg._reduce_recursive(data, None)
+        return self._reduce(data)
+
+    def _expand(self, source):
+        """Expands the variables in a string as ParamGen._expand_vars does."""
+        if "$" not in source:
+            return source
+        try:
+            return self._expanded[source]
+        except KeyError:
+            expanded = ParamGen._expand_vars(source, self._values.__getitem__)
+            self._expanded[source] = expanded
+            return expanded
+
+    def _is_guard(self, key):
+        return is_guard(self._expand(key) if isinstance(key, str) else key)
+
+    def _impose_guards(self, data):
+        true_ = [
+            guard
+            for guard in data
+            if guard == "else" or compile_guard(guard).evaluate(self._values) is True
+        ]
+        if len(true_) > 1 and "else" in true_:
+            true_.remove("else")
+        elif len(true_) == 0:
+            return None
+        if self._match == "first":
+            return data[true_[0]]
+        return data[true_[-1]]
+
+    def _reduce(self, data):
+        # resolve guarded dicts:
+        while isinstance(data, dict):
+            keys_logical = [self._is_guard(key) for key in data]
+            if all(keys_logical):
+                data = self._impose_guards(data)
+            elif any(keys_logical):
+                raise RuntimeError(
+                    "Only guarded entries are allowed in a guarded dict. Found: "
+                    + str(data)
+                )
+            else:
+                break
+
+        if isinstance(data, str):
+            data = self._expand(data)
+            if is_formula(data):
+                data = eval_formula(data.strip()[1:])
+        elif isinstance(data, dict):
+            reduced = {}
+            for key, value in data.items():
+                if isinstance(key, str):
+                    key = self._expand(key)
+                if isinstance(value, str):
+                    value = self._expand(value)
+                reduced[key] = value
+            for key, value in reduced.items():
+                if is_formula(value):
+                    reduced[key] = eval_formula(value.strip()[1:])
+            for key, value in reduced.items():
+                if isinstance(value, dict):
+                    reduced[key] = self._reduce(value)
+            data = reduced
+        return data
+
+
+class _Snapshot(dict):
+    """The values of the expandable variables, each resolved via expand_func when first needed."""
+
+    def __init__(self, expand_func):
+        super().__init__()
+        self._expand_func = expand_func
+
+    def __missing__(self, varname):
+        val = self._expand_func(varname)
+        assert (
+            val is not None
+        ), "Cannot determine the value of the variable: {}.".format(varname)
+        self[varname] = val
+        return val
+
+
+def _is_regular_dict(data):
+    """Returns whether data is a non-empty dict whose keys have no variables and are not guards,
+    i.e., a dict whose keys are the same in all reductions."""
+    return (
+        isinstance(data, dict)
+        and len(data) > 0
+        and all(
+            isinstance(key, str) and not _var_re.search(key) and not is_guard(key)
+            for key in data
+        )
+    )
+
+
+class TemplateIndex:
+    """An inverted index from the expandable variables of a template (not yet reduced) to the
+    entries of the template that refer to them in guards, keys, or values. The entries are the
+    subtrees of the template below regular dicts whose keys have no variables, e.g., the value of
+    a parameter in MOM_input.json, whether guarded or not. Since the path to an entry is the same
+    in all reductions of the template, the entries affected by a change of some variables can be
+    reduced anew and compared with, or replaced in, a previous reduction.
+
+    Parameters
+    ----------
+    data: dict
+        The template data. The data must not be modified while the index is in use.
+    """
+
+    def __init__(self, data):
+        self._entries = OrderedDict()  # template subtree and variables, by path
+        self._paths = {}  # paths of the entries, by variable
+        self._index(data, ())
+
+    def _index(self, data, path):
+        if _is_regular_dict(data):
+            for key, value in data.items():
+                self._index(value, path + (key,))
+            return
+        varnames = TemplateIndex._varnames(data)
+        if varnames:
+            self._entries[path] = (data, varnames)
+            for varname in varnames:
+                self._paths.setdefault(varname, []).append(path)
+
+    @staticmethod
+    def _varnames(data):
+        """Returns the set of the variables that data refers to."""
+        varnames = set()
+        if isinstance(data, str):
+            varnames.update(CompiledGuard._varname(w) for w in _var_re.findall(data))
+        elif isinstance(data, dict):
+            for key, value in data.items():
+                varnames |= TemplateIndex._varnames(key)
+                varnames |= TemplateIndex._varnames(value)
+        return varnames
+
+    def variables(self):
+        """Returns the (sorted) variables that the template refers to."""
+        return sorted(self._paths)
+
+    def variables_of(self, path):
+        """Returns the set of the variables that the entry at path refers to."""
+        return self._entries[path][1] if path in self._entries else set()
+
+    def affected(self, varnames):
+        """Returns the paths (tuples of keys) of the entries that refer to any of the given
+        variables, in the order of the template."""
+        varnames = set(varnames)
+        return [
+            path
+            for path, (_, entry_varnames) in self._entries.items()
+            if not varnames.isdisjoint(entry_varnames)
+        ]
+
+    def changes(self, reduced, varnames, expand_func, match="last"):
+        """Returns the entries of a previous reduction of the template that change if the
+        template is reduced anew with expand_func, for a change of the given variables, as a dict
+        mapping the paths of the entries to their (old, new) reduced values. Only the entries that
+        refer to the variables are reduced."""
+        reducer = TemplateReducer(expand_func, match)
+        changes = OrderedDict()
+        for path in self.affected(varnames):
+            if path == ():
+                raise RuntimeError(
+                    "The template is a guarded dict as a whole, so it can only be reduced anew."
+                )
+            parent = reduced
+            for key in path[:-1]:
+                parent = parent[key]
+            old = parent[path[-1]]
+            new = reducer.reduce(deepcopy(self._entries[path][0]))
+            if type(old) is not type(new) or old != new:
+                changes[path] = (old, new)
+        return changes
+
+    def reduce_affected(self, reduced, varnames, expand_func, match="last"):
+        """Updates a previous reduction of the template (in place) for a change of the given
+        variables by reducing only the entries that refer to them anew, and returns the paths of
+        the entries that changed. (See changes)"""
+        changes = self.changes(reduced, varnames, expand_func, match)
+        for path, (_, new) in changes.items():
+            parent = reduced
+            for key in path[:-1]:
+                parent = parent[key]
+            parent[path[-1]] = new
+        return list(changes)
+
+
+# The value of a variable that can't be resolved, in the keys of the groups of reduce_many.
+_unresolved = object()
+
+
+def reduce_many(data, expand_funcs, match="last"):
+    """Reduces template data for many sets of values of the expandable variables in a single pass,
+    e.g., for all the cases of a test matrix, and returns the list of the reduced data, one for
+    each of expand_funcs. Each entry of the template (see TemplateIndex) is reduced once per
+    distinct set of values of the variables it refers to, rather than once per expand_func, and
+    each guard is evaluated once per distinct set of values of its own variables (see
+    CompiledGuard). The reduced data don't share any dicts or lists with each other.
+
+    Parameters
+    ----------
+    data: dict
+        The template data, which is not modified.
+    expand_funcs: list of functions
+        The functions to infer the values of expandable variables with, one per reduction.
+    match: str
+        "first" or "last", the guard to pick if multiple guards evaluate to true.
+    """
+    return _reduce_many(data, [TemplateReducer(f, match) for f in expand_funcs])
+
+
+def _reduce_many(data, reducers):
+    if _is_regular_dict(data):
+        reduced = [{} for _ in reducers]
+        for key, value in data.items():
+            for reduced_data, reduced_value in zip(
+                reduced, _reduce_many(value, reducers)
+            ):
+                reduced_data[key] = reduced_value
+        return reduced
+
+    # Group the reductions by the values of the variables of the entry, and reduce it once per
+    # group. (Variables that a reduction fails to resolve fail it only if they are needed.)
+    varnames = sorted(TemplateIndex._varnames(data))
+    groups = {}
+    for i, reducer in enumerate(reducers):
+        key = []
+        for varname in varnames:
+            try:
+                val = reducer._values[varname]
+            except Exception:
+                val = _unresolved
+            key.append((type(val), val))
+        try:
+            groups.setdefault(tuple(key), []).append(i)
+        except TypeError:
+            groups[(_unresolved, i)] = [i]  # (unhashable values aren't grouped)
+
+    reduced = [None] * len(reducers)
+    for indices in groups.values():
+        result = reducers[indices[0]]._reduce(data)
+        reduced[indices[0]] = result
+        for i in indices[1:]:
+            reduced[i] = (
+                deepcopy(result) if isinstance(result, (dict, list)) else result
+            )
+    return reduced
+
+
+class CompiledReduction:
+    """Mixin for ParamGen subclasses (the FType_* classes) to reduce their templates with
+    TemplateReducer instead of ParamGen.reduce."""
+
+    _template_index = None
+
+    def reduce(self, expand_func=None):
+        self._set_reduced(TemplateReducer(expand_func, self._match).reduce(self._data))
+
+    def _set_reduced(self, data):
+        """Stores the reduced data."""
+        self._data = data
+        self._reduced = True
+
+    def reduce_many(self, expand_funcs):
+        """Returns copies of this object, each reduced for one of expand_funcs in a single pass
+        over the template (see reduce_many). This object is not modified."""
+        assert not self._reduced, "The template is already reduced"
+        copies = []
+        for data in reduce_many(self._data, expand_funcs, self._match):
+            obj = copy(self)
+            obj._set_reduced(data)
+            copies.append(obj)
+        return copies
+
+    def template_index(self):
+        """Returns the TemplateIndex of the template, built when first called, which must be
+        before the template is reduced."""
+        if self._template_index is None:
+            assert not self._reduced, "Must build the template index before reducing"
+            self._template_index = TemplateIndex(self._data)
+        return self._template_index
+
+    def reduce_affected(self, varnames, expand_func):
+        """Updates the reduced data for a change of the given variables, reducing only the
+        entries of the template that refer to them anew (see TemplateIndex.reduce_affected), and
+        returns the paths of the entries that changed. Requires template_index to be called
+        before the template was reduced."""
+        assert (
+            self._reduced and self._template_index is not None
+        ), "Must call template_index and reduce before reduce_affected"
+        return self._template_index.reduce_affected(
+            self._data, varnames, expand_func, self._match
+        )
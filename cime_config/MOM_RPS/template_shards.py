@@ -0,0 +1,243 @@
+import re
+import ast
+from collections import OrderedDict
+
+# The case variable that the templates are sharded by.
+GRID_VAR = "OCN_GRID"
+
+# Expandable variables, e.g., $OCN_GRID or ${OCN_GRID}, as matched by ParamGen.
+_var_re = re.compile(r"(\$\w+|\${\w+\})")
+
+
+def _varname(word):
+    return word.strip().replace("$", "").replace("{", "").replace("}", "")
+
+
+def _is_logical_expr(expr):
+    # as in CIME.ParamGen.paramgen_utils.is_logical_expr
+    if expr.strip() == "else":
+        return True
+    try:
+        return isinstance(ast.parse(expr, mode="eval").body, (ast.BoolOp, ast.Compare))
+    except SyntaxError:
+        return False
+
+
+def _placeholder_code(expr):
+    """Returns the expression with its variables replaced by Python names, or None if any of the
+    variables is expanded without quotes (${var}), i.e., if the structure of the expression may
+    depend on the values of the variables."""
+    words = _var_re.findall(expr)
+    if any(word[1] == "{" for word in words):
+        return None
+    return _var_re.sub(lambda m: "__var_" + _varname(m.group()), expr)
+
+
+def _has_vars(node):
+    return any(
+        isinstance(n, ast.Name) and n.id.startswith("__var_") for n in ast.walk(node)
+    )
+
+
+# Returned by PartialReducer._impose_guards if a guarded dict is to be left as it is.
+_ambiguous = object()
+
+
+class PartialReducer:
+    """Partially reduces template data (see ParamGen.reduce) for the known values of some of the
+    expandable variables, e.g., OCN_GRID: the known variables are expanded, and the guards that
+    only depend on known variables are resolved, as are the operands of and/or guards that do.
+    Reducing the partially reduced data for any values of the remaining variables gives the same
+    result as reducing the original data. Entries whose structure can't be determined without the
+    remaining variables are left as they are.
+
+    Parameters
+    ----------
+    values: dict
+        The values of the known variables.
+    match: str
+        "first" or "last", the guard to pick if multiple guards evaluate to true.
+    """
+
+    def __init__(self, values, match="last"):
+        self._values = values
+        self._match = match
+
+    def reduce(self, data):
+        """Returns the partially reduced copy of data."""
+        if isinstance(data, str):
+            return self._expand(data)
+        if not isinstance(data, dict):
+            return data
+
+        expanded = OrderedDict()
+        for key, value in data.items():
+            expanded[self._expand(key) if isinstance(key, str) else key] = value
+
+        guards = [self._guard(key) for key in expanded]
+        if not all(guard is not None for guard in guards):
+            # (a regular dict, or one whose keys can't be told to be guards or not)
+            return OrderedDict(
+                (key, self.reduce(value)) for key, value in expanded.items()
+            )
+        reduced = self._impose_guards(list(zip(guards, expanded.values())))
+        if reduced is _ambiguous:
+            return OrderedDict(
+                (key, self.reduce(value)) for key, value in expanded.items()
+            )
+        return reduced
+
+    def _expand(self, expr):
+        """Expands the known variables in a string as ParamGen._expand_vars does."""
+        if "$" not in expr:
+            return expr
+        for word in _var_re.findall(expr):
+            varname = _varname(word)
+            if varname not in self._values:
+                continue
+            val = self._values[varname]
+            if isinstance(val, str) and word[1] != "{":
+                val = '"' + val + '"'
+            else:
+                val = str(val)
+            expr = re.sub(r"(\$\b" + varname + r"\b|\$\{" + varname + r"\})", val, expr)
+        return expr
+
+    def _guard(self, key):
+        """Returns (value, key) for a guard, where value is True or False if the guard can be
+        resolved, "else", or None otherwise, in which case key is the (possibly simplified)
+        guard. Returns None if the key is not a guard or can't be told to be one."""
+        if not isinstance(key, str):
+            return None
+        if key == "else":
+            return ("else", key)
+        if not _var_re.search(key):
+            if not _is_logical_expr(key):
+                return None
+            try:
+                value = eval(key)
+            except Exception:
+                return None
+            return (value, key) if isinstance(value, bool) else None
+        code = _placeholder_code(key)
+        if code is None:
+            return None
+        try:
+            body = ast.parse(code, mode="eval").body
+        except SyntaxError:
+            return None
+        if isinstance(body, ast.Compare):
+            return (None, key)
+        if isinstance(body, ast.BoolOp):
+            return self._simplify(code, body, key)
+        return None
+
+    def _simplify(self, code, body, key):
+        """Resolves the operands of an and/or guard that don't have any (remaining) variables."""
+        # (the value of an operand that resolves the whole guard)
+        absorbing = isinstance(body.op, ast.Or)
+        remaining = []
+        for operand in body.values:
+            if _has_vars(operand):
+                remaining.append(operand)
+                continue
+            try:
+                value = eval(ast.get_source_segment(code, operand))
+            except Exception:
+                return (None, key)
+            if not isinstance(value, bool):
+                return (None, key)
+            if value is absorbing:
+                return (absorbing, key)
+        if not remaining:
+            return (not absorbing, key)
+        if len(remaining) == len(body.values):
+            return (None, key)
+        if len(remaining) == 1 and not isinstance(
+            remaining[0], (ast.BoolOp, ast.Compare)
+        ):
+            # (e.g., "$TEST" alone wouldn't be a guard)
+            return (None, key)
+        segments = []
+        for operand in remaining:
+            segment = ast.get_source_segment(code, operand)
+            if len(remaining) > 1 and not isinstance(operand, ast.Compare):
+                segment = "(" + segment + ")"
+            segments.append(segment)
+        simplified = (" or " if absorbing else " and ").join(segments)
+        return (None, re.sub(r"__var_(\w+)", r"$\1", simplified))
+
+    def _impose_guards(self, entries):
+        """Resolves a guarded dict, given as a list of ((value, guard), entry) pairs, into the
+        entry that is picked regardless of the remaining variables, if any, or into a guarded
+        dict of the guards that may still be picked."""
+        true_ = [i for i, ((value, _), _) in enumerate(entries) if value is True]
+        if true_:
+            # The picked true guard is picked unless an unresolved guard that comes after it (or
+            # before it, if match is "first") is true, i.e., it takes the place of "else".
+            if self._match == "first":
+                picked = true_[0]
+                undecided = [e for e in entries[:picked] if e[0][0] is None]
+            else:
+                picked = true_[-1]
+                undecided = [e for e in entries[picked + 1 :] if e[0][0] is None]
+            if not undecided:
+                return self.reduce(entries[picked][1])
+            kept = [(("else", "else"), entries[picked][1])]
+            kept = undecided + kept if self._match == "first" else kept + undecided
+        else:
+            kept = [e for e in entries if e[0][0] is None or e[0][0] == "else"]
+            if not kept:
+                return None
+            if len(kept) == 1 and kept[0][0][0] == "else":
+                return self.reduce(kept[0][1])
+        if len(set(guard for (_, guard), _ in kept)) < len(kept):
+            # (the guards simplify to the same guard, so they can't be keys of the same dict)
+            return _ambiguous
+        return OrderedDict((guard, self.reduce(entry)) for (_, guard), entry in kept)
+
+
+def template_grids(data):
+    """Returns the (sorted) grids that the guards of template data compare OCN_GRID with."""
+    grids = set()
+
+    def _collect(data):
+        if not isinstance(data, dict):
+            return
+        for key, value in data.items():
+            if isinstance(key, str) and GRID_VAR in key:
+                code = _placeholder_code(key)
+                try:
+                    body = ast.parse(code, mode="eval").body if code else None
+                except SyntaxError:
+                    body = None
+                for node in ast.walk(body) if body is not None else []:
+                    if not isinstance(node, ast.Compare):
+                        continue
+                    operands = [node.left] + node.comparators
+                    if not any(
+                        isinstance(n, ast.Name) and n.id == "__var_" + GRID_VAR
+                        for n in operands
+                    ):
+                        continue
+                    for operand in operands:
+                        items = (
+                            operand.elts
+                            if isinstance(operand, (ast.List, ast.Tuple, ast.Set))
+                            else [operand]
+                        )
+                        for item in items:
+                            if isinstance(item, ast.Constant) and isinstance(
+                                item.value, str
+                            ):
+                                grids.add(item.value)
+            _collect(value)
+
+    _collect(data)
+    return sorted(grids)
+
+
+def shard(data, grid, match="last"):
+    """Returns the shard of template data for a grid, i.e., the data partially reduced for
+    OCN_GRID=grid."""
+    return PartialReducer({GRID_VAR: grid}, match).reduce(data)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+import os
+import argparse
+import numpy as np
+from utils import cached_mpp_compute_extent
+from lbe import (
+    pad_array,
+    read_padded_mask,
+    build_wet_cell_sat,
+    determine_land_blocks_sat,
+    explore_layouts,
+    write_layouts_table,
+)
+
+descr = """
+MOM6 halo exchange cost model for candidate domain decompositions. Ranks the land block
+elimination layouts of a range of NTASKS_OCN by a combined computation and communication
+score. Must have the numpy and xarray packages installed.
+"""
+
+# Offsets (di, dj) of the eight neighbours of a block that take part in a halo update.
+NEIGHBOUR_OFFSETS = [
+    (-1, 0),
+    (1, 0),
+    (0, -1),
+    (0, 1),
+    (-1, -1),
+    (1, -1),
+    (-1, 1),
+    (1, 1),
+]
+
+
+def pad_block_array(blocks, reentrant_x, reentrant_y, tripolar_n, fill=False):
+    """Pads an (idiv, jdiv) array of per-block values by one block on each side, such that the
+    padding holds the values of the neighbouring blocks across the domain boundaries.
+
+    Parameters:
+    -----------
+    blocks: 2D numpy array
+        Array of per-block values indexed as [i, j].
+    reentrant_x: bool
+        Is the domain reentrant in x-dir?
+    reentrant_y: bool
+        Is the domain reentrant in y-dir?
+    tripolar_n: bool
+        Is the domain tripolar? If so, the northern neighbours of the blocks in the last row are
+        the blocks of the last row mirrored in x-dir. (This assumes symmetric extents, which
+        mpp_compute_extent produces whenever possible.)
+    fill:
+        Value of the padding across closed boundaries.
+
+    Returns:
+    --------
+    padded: 2D numpy array
+        Array of shape (idiv + 2, jdiv + 2).
+    """
+
+    return pad_array(
+        blocks.T, 1, 1, reentrant_x, reentrant_y, tripolar_n, fill, blocks.dtype
+    ).T
+
+
+def halo_exchange_costs(
+    nx,
+    ny,
+    idiv,
+    jdiv,
+    masked_blocks,
+    ihalo,
+    jhalo,
+    reentrant_x,
+    reentrant_y,
+    tripolar_n,
+    bytes_per_cell=8,
+):
+    """Computes the per-PE halo exchange costs of a given layout.
+
+    Parameters:
+    -----------
+    nx, ny: int
+        Number of cells in x and y direction.
+    idiv, jdiv: int
+        Number of partitions in x and y direction.
+    masked_blocks: list of tuples
+        (1-based) indices of the blocks that are eliminated, as written in the mask table.
+    ihalo, jhalo: int
+        Halo widths in x and y direction (NIHALO, NJHALO).
+    reentrant_x, reentrant_y, tripolar_n: bool
+        Connectivity of the domain.
+    bytes_per_cell: int
+        Number of bytes exchanged per halo cell, e.g., 8 for a 2D double precision field or
+        8 * nk for a 3D field with nk layers.
+
+    Returns:
+    --------
+    costs: dict of 2D numpy arrays
+        Arrays of shape (idiv, jdiv) indexed as [i, j]: "active" (whether the block is active),
+        "cells" (number of interior cells), "halo_cells" (number of halo cells around the block),
+        "neighbours" (number of active neighbours exchanged with), and "bytes" (number of bytes
+        received from active neighbours per halo update). Entries of masked blocks are zero. A block
+        that is its own neighbour across a boundary, e.g., if idiv == 1 and the domain is
+        reentrant in x, updates its halo locally, which is not counted as an exchange.
+    """
+
+    ibegin, iend = cached_mpp_compute_extent(1, nx, idiv)
+    jbegin, jend = cached_mpp_compute_extent(1, ny, jdiv)
+    width = np.asarray(iend) - np.asarray(ibegin) + 1
+    height = np.asarray(jend) - np.asarray(jbegin) + 1
+
+    active = np.ones((idiv, jdiv), dtype=bool)
+    for i, j in masked_blocks:
+        active[i - 1, j - 1] = False
+    active_padded = pad_block_array(active, reentrant_x, reentrant_y, tripolar_n)
+    block_ids = np.arange(idiv * jdiv).reshape(idiv, jdiv)
+    block_ids_padded = pad_block_array(
+        block_ids, reentrant_x, reentrant_y, tripolar_n, fill=-1
+    )
+
+    # number of cells exchanged with the neighbour at each offset
+    w = np.broadcast_to(width[:, None], (idiv, jdiv))
+    h = np.broadcast_to(height[None, :], (idiv, jdiv))
+    exchanged = {
+        (di, dj): (ihalo * h if dj == 0 else jhalo * w if di == 0 else ihalo * jhalo)
+        for di, dj in NEIGHBOUR_OFFSETS
+    }
+
+    neighbours = np.zeros((idiv, jdiv), dtype=np.int64)
+    cells_in = np.zeros((idiv, jdiv), dtype=np.int64)
+    for (di, dj), ncells in exchanged.items():
+        nbr = (slice(1 + di, idiv + 1 + di), slice(1 + dj, jdiv + 1 + dj))
+        nbr_active = active_padded[nbr] & (block_ids_padded[nbr] != block_ids)
+        neighbours += nbr_active
+        cells_in += np.where(nbr_active, ncells, 0)
+
+    cells = w * h
+    halo_cells = (w + 2 * ihalo) * (h + 2 * jhalo) - cells
+    return {
+        "active": active,
+        "cells": np.where(active, cells, 0),
+        "halo_cells": np.where(active, halo_cells, 0),
+        "neighbours": np.where(active, neighbours, 0),
+        "bytes": np.where(active, cells_in * bytes_per_cell, 0),
+    }
+
+
+def layout_score(costs, cell_time, latency, bandwidth):
+    """Combined computation and communication time estimate of a layout, i.e., the time of the
+    slowest PE to update its interior cells and then receive its halos from its neighbours.
+
+    Parameters:
+    -----------
+    costs: dict
+        Per-PE costs as returned by halo_exchange_costs.
+    cell_time: float
+        Computation time per interior cell (seconds).
+    latency: float
+        Time per message (seconds).
+    bandwidth: float
+        Bytes transferred per second.
+    """
+    t = (
+        costs["cells"] * cell_time
+        + costs["neighbours"] * latency
+        + costs["bytes"] / bandwidth
+    )
+    return float(t[costs["active"]].max())
+
+
+def rank_layouts(
+    mask,
+    nx,
+    ny,
+    npes_range,
+    ihalo,
+    jhalo,
+    reentrant_x,
+    reentrant_y,
+    tripolar_n,
+    target_io_pes=1,
+    bytes_per_cell=8,
+    cell_time=1.0e-7,
+    latency=2.0e-6,
+    bandwidth=1.0e10,
+    ibuf=2,
+    jbuf=2,
+):
+    """Ranks the feasible land block elimination layouts of a range of PE counts by their combined
+    computation and communication score.
+
+    Parameters:
+    -----------
+    mask: 2D numpy array
+        Padded mask array with 1s for ocean cells and 0s for land cells.
+    nx, ny: int
+        Number of cells in x and y direction.
+    npes_range: iterable of int
+        PE counts (NTASKS_OCN) to explore.
+    ihalo, jhalo: int
+        Halo widths in x and y direction (NIHALO, NJHALO).
+    reentrant_x, reentrant_y, tripolar_n: bool
+        Connectivity of the domain.
+    target_io_pes: int
+        Number of target I/O PEs.
+    bytes_per_cell, cell_time, latency, bandwidth:
+        Cost model parameters, see halo_exchange_costs and layout_score.
+    ibuf, jbuf: int
+        Buffer widths of the padded mask array.
+
+    Returns:
+    --------
+    layouts: list of dicts
+        The layouts returned by explore_layouts, with the additional keys max_neighbours,
+        max_halo_bytes, mean_halo_bytes, and score, ranked by score.
+    """
+
+    sat = build_wet_cell_sat(mask)
+    layouts = explore_layouts(
+        mask, nx, ny, ibuf, jbuf, npes_range, target_io_pes, sat=sat
+    )
+    for layout in layouts:
+        idiv, jdiv, npes = layout["idiv"], layout["jdiv"], layout["npes"]
+        land_blocks = determine_land_blocks_sat(sat, nx, ny, idiv, jdiv, ibuf, jbuf)
+        costs = halo_exchange_costs(
+            nx,
+            ny,
+            idiv,
+            jdiv,
+            land_blocks[: idiv * jdiv - npes],
+            ihalo,
+            jhalo,
+            reentrant_x,
+            reentrant_y,
+            tripolar_n,
+            bytes_per_cell,
+        )
+        active = costs["active"]
+        del layout["rank"]
+        layout["max_neighbours"] = int(costs["neighbours"][active].max())
+        layout["max_halo_bytes"] = int(costs["bytes"][active].max())
+        layout["mean_halo_bytes"] = float(costs["bytes"][active].mean())
+        layout["score"] = layout_score(costs, cell_time, latency, bandwidth)
+
+    layouts.sort(key=lambda layout: (layout["score"], layout["npes"]))
+    for rank, layout in enumerate(layouts, 1):
+        layout["rank"] = rank
+    return layouts
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=descr)
+    parser.add_argument(
+        "-t",
+        metavar="topofile",
+        type=str,
+        required=True,
+        help="MOM6 topography file path (TOPO_FILE)",
+    )
+    parser.add_argument(
+        "-n",
+        metavar="NMIN:NMAX",
+        type=str,
+        required=True,
+        help="(Inclusive) range of MOM6 PEs (NTASKS_OCN) to rank the layouts of",
+    )
+    parser.add_argument(
+        "--tiopes",
+        default=1,
+        type=int,
+        required=False,
+        help="Number of target I/O PEs (NTASKS_IO) (default: 1)",
+    )
+    parser.add_argument(
+        "--halo",
+        nargs=2,
+        default=[4, 4],
+        type=int,
+        metavar=("NIHALO", "NJHALO"),
+        help="Halo widths in x and y direction (default: 4 4)",
+    )
+    parser.add_argument(
+        "--nk",
+        default=1,
+        type=int,
+        help="Number of layers exchanged per halo update (default: 1)",
+    )
+    parser.add_argument(
+        "--cell-time",
+        default=1.0e-7,
+        type=float,
+        help="Computation time per interior cell and layer in seconds (default: 1e-7)",
+    )
+    parser.add_argument(
+        "--latency",
+        default=2.0e-6,
+        type=float,
+        help="Time per message in seconds (default: 2e-6)",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        default=1.0e10,
+        type=float,
+        help="Bytes transferred per second (default: 1e10)",
+    )
+    parser.add_argument(
+        "-rx",
+        default=False,
+        action="store_true",
+        help="Is the domain reentrant in x-dir?",
+    )
+    parser.add_argument(
+        "-ry",
+        default=False,
+        action="store_true",
+        help="Is the domain reentrant in y-dir?",
+    )
+    parser.add_argument(
+        "-tn", default=False, action="store_true", help="Is the domain tripolar?"
+    )
+    parser.add_argument(
+        "-o",
+        metavar="table_path",
+        type=str,
+        required=False,
+        help="Path of the CSV (default) or JSON (.json) file to write the ranked layouts to "
+        "(default: ./MOM_layouts_halo_cost.csv)",
+    )
+    args = parser.parse_args()
+
+    nmin, nmax = (int(n) for n in args.n.split(":"))
+    mask, nx, ny = read_padded_mask(args.t, args.rx, args.ry, args.tn)
+    layouts = rank_layouts(
+        mask,
+        nx,
+        ny,
+        range(nmin, nmax + 1),
+        args.halo[0],
+        args.halo[1],
+        args.rx,
+        args.ry,
+        args.tn,
+        target_io_pes=args.tiopes,
+        bytes_per_cell=8 * args.nk,
+        cell_time=args.cell_time * args.nk,
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+    )
+    write_layouts_table(
+        layouts, args.o or os.path.join(os.getcwd(), "MOM_layouts_halo_cost.csv")
+    )
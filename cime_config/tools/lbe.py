@@ -1,10 +1,20 @@
 #!/usr/bin/env python3
 
 import os
+import csv
+import json
 import xarray as xr
 import numpy as np
 import argparse
-from utils import MOM_define_layout, mpp_compute_extent
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from utils import (
+    cached_MOM_define_layout,
+    cached_mpp_compute_extent,
+    MOM_define_layout_batch,
+    largest_extent_batch,
+)
+from mask_table_cache import MaskTableCache
 
 descr = """
 MOM6 land block elimination preprocessor module
@@ -38,11 +48,14 @@ def determine_land_blocks(mask, nx, ny, idiv, jdiv, ibuf, jbuf):
     --------
     masktable: list of tuples
         List of tuples containing the indices of the blocks that are all land cells.
+
+    NOTE: This function searches each block separately and is kept as the reference
+    implementation of determine_land_blocks_sat, which should be preferred in practice.
     """
 
     # 1-based begin and end indices
-    ibegin, iend = mpp_compute_extent(1, nx, idiv)
-    jbegin, jend = mpp_compute_extent(1, ny, jdiv)
+    ibegin, iend = cached_mpp_compute_extent(1, nx, idiv)
+    jbegin, jend = cached_mpp_compute_extent(1, ny, jdiv)
 
     masktable = []
 
@@ -62,54 +75,209 @@ def determine_land_blocks(mask, nx, ny, idiv, jdiv, ibuf, jbuf):
     return masktable
 
 
-def gen_auto_mask_table(
-    topo_file_path, npes, reentrant_x, reentrant_y, tripolar_n, output_dir
+def build_wet_cell_sat(mask):
+    """Builds a summed-area table (integral image) of the wet cells in a given mask array. The
+    table is built once per topography and allows the number of wet cells in any rectangular
+    region of the mask to be computed with four lookups.
+
+    Parameters:
+    -----------
+    mask: 2D numpy array
+        (Padded) mask array with 1s for ocean cells and 0s for land cells.
+
+    Returns:
+    --------
+    sat: 2D numpy array
+        Summed-area table of shape (mask.shape[0] + 1, mask.shape[1] + 1), where sat[j, i] is the
+        number of wet cells in mask[:j, :i].
+    """
+
+    # int32 suffices unless the number of cells overflows it, which halves the size of the table.
+    dtype = np.int32 if mask.size < np.iinfo(np.int32).max else np.int64
+    sat = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=dtype)
+    np.equal(mask, 1, out=sat[1:, 1:], casting="unsafe")
+    np.cumsum(sat[1:, 1:], axis=0, out=sat[1:, 1:])
+    np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+    return sat
+
+
+def count_block_wet_cells(sat, nx, ny, idiv, jdiv, ibuf, jbuf, include_halo=True):
+    """Given a summed-area table of a padded mask array, computes the number of wet cells in each
+    block (partition) of an idiv x jdiv layout, including the halo cells of the block by default.
+
+    Parameters:
+    -----------
+    sat: 2D numpy array
+        Summed-area table of the padded mask array, as returned by build_wet_cell_sat.
+    nx: int
+        Number of cells in x direction.
+    ny: int
+        Number of cells in y direction.
+    idiv: int
+        Number of partitions in x direction.
+    jdiv: int
+        Number of partitions in y direction.
+    ibuf: int
+        Buffer width in x direction.
+    jbuf: int
+        Buffer width in y direction.
+    include_halo: bool
+        If False, only the wet cells in the interior (computational domain) of blocks are counted.
+
+    Returns:
+    --------
+    counts: 2D numpy array
+        Array of shape (idiv, jdiv) with the number of wet cells in each block.
+    """
+
+    # 1-based begin and end indices
+    ibegin, iend = cached_mpp_compute_extent(1, nx, idiv)
+    jbegin, jend = cached_mpp_compute_extent(1, ny, jdiv)
+
+    # zero-based, exclusive bounds of the halo-extended blocks in the padded mask array.
+    ib = np.asarray(ibegin) - 1
+    ie = np.asarray(iend) + 2 * ibuf
+    jb = np.asarray(jbegin) - 1
+    je = np.asarray(jend) + 2 * jbuf
+
+    if not include_halo:
+        ib, ie, jb, je = ib + ibuf, ie - ibuf, jb + jbuf, je - jbuf
+
+    counts = (
+        sat[np.ix_(je, ie)]
+        - sat[np.ix_(jb, ie)]
+        - sat[np.ix_(je, ib)]
+        + sat[np.ix_(jb, ib)]
+    )
+    return counts.T
+
+
+def determine_land_blocks_sat(sat, nx, ny, idiv, jdiv, ibuf, jbuf):
+    """Same as determine_land_blocks, but uses a summed-area table of the padded mask array to
+    find all land blocks at once, instead of searching each block for ocean cells.
+
+    Parameters:
+    -----------
+    sat: 2D numpy array
+        Summed-area table of the padded mask array, as returned by build_wet_cell_sat.
+    nx, ny, idiv, jdiv, ibuf, jbuf: int
+        See determine_land_blocks.
+
+    Returns:
+    --------
+    masktable: list of tuples
+        List of tuples containing the indices of the blocks that are all land cells.
+    """
+
+    counts = count_block_wet_cells(sat, nx, ny, idiv, jdiv, ibuf, jbuf)
+    return [(int(i) + 1, int(j) + 1) for i, j in np.argwhere(counts == 0)]
+
+
+def fill_halo(array, ibuf, jbuf, reentrant_x, reentrant_y, tripolar_n):
+    """Fills in (in place) the buffer cells of a padded array according to the connectivity of the
+    domain, using array slicing only. The array may be a padded mask, or any other 2D field
+    defined on the grid or on the blocks of a layout.
+
+    Parameters:
+    -----------
+    array: 2D numpy array
+        Array indexed as [j, i], padded by jbuf rows and ibuf columns on each side.
+    ibuf: int
+        Buffer width in x direction.
+    jbuf: int
+        Buffer width in y direction.
+    reentrant_x: bool
+        Is the domain reentrant in x-dir?
+    reentrant_y: bool
+        Is the domain reentrant in y-dir?
+    tripolar_n: bool
+        Is the domain tripolar? If so, the northern buffer rows are filled with the last rows
+        of the domain, folded across the tripolar seam (i.e., flipped in both directions).
+
+    Returns:
+    --------
+    array: 2D numpy array
+        The same array, with its buffer cells filled in.
+    """
+
+    ny = array.shape[0] - 2 * jbuf
+    nx = array.shape[1] - 2 * ibuf
+
+    if reentrant_x:
+        array[:, :ibuf] = array[:, nx : nx + ibuf]
+        array[:, ibuf + nx :] = array[:, ibuf : 2 * ibuf]
+
+    if reentrant_y:
+        array[:jbuf, :] = array[ny : ny + jbuf, :]
+        array[jbuf + ny :, :] = array[jbuf : 2 * jbuf, :]
+
+    if tripolar_n and jbuf > 0:
+        array[jbuf + ny :, :] = array[jbuf + ny - 1 : ny - 1 : -1, ::-1]
+
+    return array
+
+
+def pad_array(
+    array, ibuf, jbuf, reentrant_x, reentrant_y, tripolar_n, fill=0, dtype=np.float64
 ):
-    """Generates the auto mask table for MOM6 based on the topography file and the number of PEs.
+    """Returns a copy of a given 2D array (indexed as [j, i]) padded by jbuf rows and ibuf columns
+    on each side. The buffer cells are filled in according to the connectivity of the domain (see
+    fill_halo), or set to fill across closed boundaries."""
+
+    ny, nx = array.shape
+    padded = np.full((ny + 2 * jbuf, nx + 2 * ibuf), fill, dtype=dtype)
+    padded[jbuf : ny + jbuf, ibuf : nx + ibuf] = array
+    return fill_halo(padded, ibuf, jbuf, reentrant_x, reentrant_y, tripolar_n)
+
+
+def read_padded_mask(
+    topo_file_path, reentrant_x, reentrant_y, tripolar_n, ibuf=2, jbuf=2, chunk_rows=512
+):
+    """Reads the mask of a topography file into an array padded by buffer cells, which are filled
+    in according to the connectivity of the domain. The mask is read lazily, chunk_rows rows at a
+    time, into a uint8 array, so the peak memory usage is about one byte per cell.
 
     Parameters:
     -----------
     topo_file_path: str
         Path to the topography file.
-    npes: int
-        Number of PEs.
     reentrant_x: bool
         Is the domain reentrant in x-dir?
     reentrant_y: bool
         Is the domain reentrant in y-dir?
     tripolar_n: bool
         Is the domain tripolar?
-    output_dir: str
-        Output directory to write the mask table.
-    """
+    ibuf: int
+        Buffer width in x direction.
+    jbuf: int
+        Buffer width in y direction.
+    chunk_rows: int
+        Number of rows of the mask to read at a time.
 
-    ibuf = 2
-    jbuf = 2
-    num_masked_blocks = 0
+    Returns:
+    --------
+    mask: 2D numpy array
+        Padded uint8 mask array with 1s for ocean cells and 0s for land cells.
+    nx: int
+        Number of cells in x direction.
+    ny: int
+        Number of cells in y direction.
+    """
 
-    ds_topog = xr.open_dataset(topo_file_path)
-    if "mask" in ds_topog:
-        ny, nx = ds_topog.mask.shape
-        mask = np.zeros((ny + 2 * jbuf, nx + 2 * ibuf))
-        mask[jbuf : ny + jbuf, ibuf : nx + ibuf] = ds_topog.mask.data
-    elif "wet" in ds_topog:
-        ny, nx = ds_topog.wet.shape
-        mask = np.zeros((ny + 2 * jbuf, nx + 2 * ibuf))
-        mask[jbuf : ny + jbuf, ibuf : nx + ibuf] = ds_topog.wet.data
-
-    # fill in buffer cells
-    if reentrant_x:
-        mask[:, :ibuf] = mask[:, nx : nx + ibuf]
-        mask[:, ibuf + nx :] = mask[:, ibuf : 2 * ibuf]
+    with xr.open_dataset(topo_file_path, cache=False) as ds_topog:
+        da_mask = ds_topog["mask"] if "mask" in ds_topog else ds_topog["wet"]
+        ny, nx = da_mask.shape
 
-    if reentrant_y:
-        mask[:jbuf, :] = mask[ny : ny + jbuf, :]
-        mask[jbuf + ny :, :] = mask[jbuf : 2 * jbuf, :]
+        # Read the mask in chunks of rows directly into a compact (one byte per cell) padded
+        # array, such that no full-size floating point copy of the mask is held in memory.
+        mask = np.zeros((ny + 2 * jbuf, nx + 2 * ibuf), dtype=np.uint8)
+        for j0 in range(0, ny, chunk_rows):
+            j1 = min(j0 + chunk_rows, ny)
+            mask[jbuf + j0 : jbuf + j1, ibuf : nx + ibuf] = (
+                da_mask[j0:j1, :].values == 1
+            )
 
-    if tripolar_n:
-        for j in range(jbuf):
-            for i in range(nx + 2 * ibuf):
-                mask[jbuf + ny + j, i] = mask[jbuf + ny - 1 - j, nx + 2 * ibuf - 1 - i]
+    fill_halo(mask, ibuf, jbuf, reentrant_x, reentrant_y, tripolar_n)
 
     # Tripolar Stitch Fix: In cases where masking is asymmetrical across the tripolar stitch, there's a possibility
     # that certain unmasked blocks won't be able to obtain grid metrics from the halo points. This occurs when the
@@ -120,15 +288,254 @@ def gen_auto_mask_table(
     if tripolar_n:
         mask[jbuf + ny - 1, :] = 1
 
+    return mask, nx, ny
+
+
+def gen_auto_mask_table(
+    topo_file_path,
+    npes,
+    reentrant_x,
+    reentrant_y,
+    tripolar_n,
+    output_dir,
+    tiopes=1,
+    nworkers=1,
+    chunk_rows=512,
+    cache_dir=None,
+    filename="MOM_auto_mask_table",
+):
+    """Generates the auto mask table for MOM6 based on the topography file and the number of PEs,
+    and writes it to output_dir/filename. If a cache directory is given (or set via the
+    MOM6_MASK_TABLE_CACHE_DIR environment variable), results are looked up in and stored to a
+    persistent mask table cache, so that the layout search is done only once per topography and
+    PE configuration.
+
+    Parameters:
+    -----------
+    topo_file_path: str
+        Path to the topography file.
+    npes: int
+        Number of PEs.
+    reentrant_x: bool
+        Is the domain reentrant in x-dir?
+    reentrant_y: bool
+        Is the domain reentrant in y-dir?
+    tripolar_n: bool
+        Is the domain tripolar?
+    output_dir: str
+        Output directory to write the mask table.
+    tiopes: int
+        Number of target I/O PEs.
+    nworkers: int
+        Number of processes to search for the layout with.
+    chunk_rows: int
+        Number of rows of the topography mask to read at a time.
+    cache_dir: str
+        Mask table cache directory.
+    filename: str
+        Name of the mask table file.
+
+    Returns:
+    --------
+    idiv, jdiv: int
+        Number of partitions in x and y direction.
+    idiv_io, jdiv_io: int
+        I/O layout, or None if no feasible I/O layout is found.
+    """
+
+    ibuf = 2
+    jbuf = 2
+
+    cache = MaskTableCache.from_env(cache_dir)
+    if cache is not None:
+        key = cache.key(
+            topo_file_path,
+            npes,
+            tiopes,
+            reentrant_x,
+            reentrant_y,
+            tripolar_n,
+            ibuf,
+            jbuf,
+        )
+        entry = cache.get(key)
+        if entry is not None:
+            print("Found the layout in the mask table cache.")
+            idiv, jdiv = entry["layout"]
+            write_auto_mask_file(
+                [tuple(block) for block in entry["mask_table"]],
+                idiv,
+                jdiv,
+                npes,
+                output_dir,
+                filename,
+            )
+            return idiv, jdiv, *entry["io_layout"]
+
+    mask, nx, ny = read_padded_mask(
+        topo_file_path, reentrant_x, reentrant_y, tripolar_n, ibuf, jbuf, chunk_rows
+    )
+
+    idiv, jdiv, idiv_io, jdiv_io, mask_table = search_auto_mask_layout(
+        mask, nx, ny, ibuf, jbuf, npes, tiopes, nworkers
+    )
+    mask_table = mask_table[: idiv * jdiv - npes]
+    write_auto_mask_file(mask_table, idiv, jdiv, npes, output_dir, filename)
+
+    if cache is not None:
+        cache.put(
+            key,
+            {
+                "layout": [idiv, jdiv],
+                "io_layout": [idiv_io, jdiv_io],
+                "mask_table": mask_table,
+            },
+        )
+
+    return idiv, jdiv, idiv_io, jdiv_io
+
+
+def _evaluate_division_count(sat, nx, ny, ibuf, jbuf, p, r_extreme, layout=None):
+    """Computes the layout for division count p (unless given) and the number of land blocks it has.
+
+    Returns:
+    --------
+    idiv, jdiv, num_masked_blocks: int
+        The layout and the number of land blocks. num_masked_blocks is None if the
+        aspect ratio of the layout is extreme.
+    """
+    idiv, jdiv = layout if layout is not None else cached_MOM_define_layout(nx, ny, p)
+
+    # don't bother counting land blocks if the aspect ratio is extreme
+    ar = (nx / idiv) / (ny / jdiv)
+    if ar * r_extreme < 1.0 or r_extreme < ar:
+        return idiv, jdiv, None
+
+    counts = count_block_wet_cells(sat, nx, ny, idiv, jdiv, ibuf, jbuf)
+    return idiv, jdiv, int(np.count_nonzero(counts == 0))
+
+
+# Read-only state of the process pool workers of _CandidateEvaluator
+_worker_state = {}
+
+
+def _init_worker(shm_name, shape, dtype, nx, ny, ibuf, jbuf, r_extreme):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    sat = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    sat.flags.writeable = False
+    _worker_state.update(shm=shm, args=(sat, nx, ny, ibuf, jbuf))
+    _worker_state["r_extreme"] = r_extreme
+
+
+def _evaluate_in_worker(p):
+    return p, _evaluate_division_count(
+        *_worker_state["args"], p, _worker_state["r_extreme"]
+    )
+
+
+class _CandidateEvaluator:
+    """Evaluates the division counts visited by search_auto_mask_layout and memoizes the results.
+    If nworkers > 1, division counts are evaluated in batches on a process pool that shares the
+    summed-area table of the mask read-only via shared memory. Since the results are consumed in
+    the same order as the serial search, the outcome is identical to the serial path."""
+
+    def __init__(self, sat, nx, ny, ibuf, jbuf, r_extreme, nworkers=1, batch_size=None):
+        self.args = (sat, nx, ny, ibuf, jbuf)
+        self.r_extreme = r_extreme
+        self.nworkers = nworkers
+        self.batch_size = batch_size or 4 * nworkers
+        self.results = {}
+        self.pool = None
+        self.shm = None
+
+    def __enter__(self):
+        if self.nworkers > 1:
+            sat = self.args[0]
+            self.shm = shared_memory.SharedMemory(create=True, size=sat.nbytes)
+            np.ndarray(sat.shape, dtype=sat.dtype, buffer=self.shm.buf)[...] = sat
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.nworkers,
+                initializer=_init_worker,
+                initargs=(
+                    self.shm.name,
+                    sat.shape,
+                    sat.dtype,
+                    *self.args[1:],
+                    self.r_extreme,
+                ),
+            )
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+
+    def get(self, p, p_low):
+        """Returns the evaluation of division count p. When p is not evaluated yet, the next batch of
+        division counts p, p-1, ..., (down to but excluding p_low) is evaluated at once.
+        """
+        if p not in self.results:
+            if self.pool is None:
+                self.results[p] = _evaluate_division_count(
+                    *self.args, p, self.r_extreme
+                )
+            else:
+                batch = [
+                    q
+                    for q in range(p, max(p - self.batch_size, p_low), -1)
+                    if q not in self.results
+                ]
+                self.results.update(self.pool.map(_evaluate_in_worker, batch))
+        return self.results[p]
+
+
+def search_auto_mask_layout(
+    mask, nx, ny, ibuf, jbuf, npes, target_io_pes=1, nworkers=1
+):
+    """Searches for the layout with the largest number of divisions such that eliminating its land
+    blocks leaves at most npes active blocks.
+
+    Parameters:
+    -----------
+    mask: 2D numpy array
+        Padded mask array with 1s for ocean cells and 0s for land cells.
+    nx, ny: int
+        Number of cells in x and y direction.
+    ibuf, jbuf: int
+        Buffer widths in x and y direction.
+    npes: int
+        Number of PEs.
+    target_io_pes: int
+        Number of target I/O PEs.
+    nworkers: int
+        Number of processes to evaluate candidate division counts with (default: 1, i.e., serial).
+
+    Returns:
+    --------
+    idiv, jdiv: int
+        Number of partitions in x and y direction.
+    idiv_io, jdiv_io: int
+        I/O layout, or None if no feasible I/O layout is found.
+    mask_table: list of tuples
+        List of tuples containing the indices of the blocks that are all land cells.
+    """
+
     # aspect ratio limit (>1) for a layout to be considered
     r_extreme = 4.0
 
     # ratio of ocean cells to total number of cells
     glob_ocn_frac = mask[jbuf : ny + jbuf, ibuf : nx + ibuf].sum() / (ny * nx)
 
+    # summed-area table of wet cells, used to count the wet cells of all blocks of a layout at once
+    sat = build_wet_cell_sat(mask)
+
     pfrac = 0.01
     max_feasible_p = 0
-    target_io_pes = args.tiopes
+    num_masked_blocks = 0
+    idiv_io, jdiv_io = None, None
     found_feasible_layout = False
 
     # Iteratively check for all possible division counts starting from the upper bound of npes/glob_ocn_frac,
@@ -137,68 +544,208 @@ def gen_auto_mask_table(
     # the iteration continues until max_feasible_p * (1 - pfrac) is reached or the target_io_pes is satisfiable.
     # If not, the target_io_pes is decremented and the iteration is re-done from max_feasible_p to max_feasible_p * (1 - pfrac).
 
-    for i in range(target_io_pes, 0, -1):
+    with _CandidateEvaluator(sat, nx, ny, ibuf, jbuf, r_extreme, nworkers) as evaluator:
 
-        if found_feasible_layout:
-            break
+        for i in range(target_io_pes, 0, -1):
 
-        if max_feasible_p == 0:  # first iteration
-            p_up = int(np.ceil(npes / glob_ocn_frac))
-        else:
-            p_up = max_feasible_p
+            if found_feasible_layout:
+                break
 
-        for p in range(p_up, npes, -1):
+            if max_feasible_p == 0:  # first iteration
+                p_up = int(np.ceil(npes / glob_ocn_frac))
+            else:
+                p_up = max_feasible_p
 
-            # compute the layout for the current division count, p
-            idiv, jdiv = MOM_define_layout(nx, ny, p)
+            for p in range(p_up, npes, -1):
 
-            # don't bother checking this p if the aspect ratio is extreme
-            ar = (nx / idiv) / (ny / jdiv)
-            if ar * r_extreme < 1.0 or r_extreme < ar:
-                continue
+                # compute the layout and the number of masked blocks for the current division count, p
+                idiv, jdiv, p_masked_blocks = evaluator.get(p, npes)
 
-            # Get the number of masked_blocks for this particular division count
-            mask_table = determine_land_blocks(mask, nx, ny, idiv, jdiv, ibuf, jbuf)
+                # don't bother checking this p if the aspect ratio is extreme
+                if p_masked_blocks is None:
+                    continue
 
-            # If we can eliminate enough blocks to reach the target npes, adopt
-            # this p (and the associated layout) and terminate the iteration.
-            num_masked_blocks = len(mask_table)
+                # If we can eliminate enough blocks to reach the target npes, adopt
+                # this p (and the associated layout) and terminate the iteration.
+                num_masked_blocks = p_masked_blocks
 
-            if p - num_masked_blocks <= npes:
-                print(
-                    f"ndivs: {p}, masked_blocks: {num_masked_blocks}",
-                    "  idiv: ",
-                    idiv,
-                    "jdiv",
-                    jdiv,
-                )
-
-                if max_feasible_p == 0:
-                    print("^^^^^^^^^^^^^^^ first feasible layout ^^^^^^^^^^^^^^^")
-                    max_feasible_p = p
-                if (idiv * jdiv) % i == 0:
-                    idiv_io, jdiv_io = determine_io_layout(idiv, jdiv, i)
-                    # if the io layout ratio is extreme, skip this layout
-                    ar = (idiv / idiv_io) / (jdiv / jdiv_io)
-                    if ar * r_extreme < 1.0 or r_extreme < ar:
-                        continue
-                    print(f"IO layout: {idiv_io} x {jdiv_io}")
+                if p - num_masked_blocks <= npes:
                     print(
-                        "Found the optimum layout for auto-masking. Terminating iteration."
+                        f"ndivs: {p}, masked_blocks: {num_masked_blocks}",
+                        "  idiv: ",
+                        idiv,
+                        "jdiv",
+                        jdiv,
                     )
-                    found_feasible_layout = True
-                    break
 
-            if p <= max_feasible_p * (1 - pfrac):
-                break
+                    if max_feasible_p == 0:
+                        print("^^^^^^^^^^^^^^^ first feasible layout ^^^^^^^^^^^^^^^")
+                        max_feasible_p = p
+                    if (idiv * jdiv) % i == 0:
+                        idiv_io, jdiv_io = determine_io_layout(idiv, jdiv, i)
+                        # if the io layout ratio is extreme, skip this layout
+                        ar = (idiv / idiv_io) / (jdiv / jdiv_io)
+                        if ar * r_extreme < 1.0 or r_extreme < ar:
+                            idiv_io, jdiv_io = None, None
+                            continue
+                        print(f"IO layout: {idiv_io} x {jdiv_io}")
+                        print(
+                            "Found the optimum layout for auto-masking. Terminating iteration."
+                        )
+                        found_feasible_layout = True
+                        break
+
+                if p <= max_feasible_p * (1 - pfrac):
+                    break
 
     if num_masked_blocks == 0:
         raise RuntimeError(
             "Couldn't auto-eliminate any land blocks. Try to increase the number"
         )
 
-    # Call determine_land_blocks once again, this time to retrieve and write out the mask_table.
-    mask_table = determine_land_blocks(mask, nx, ny, idiv, jdiv, ibuf, jbuf)
+    # Call determine_land_blocks_sat once again, this time to retrieve and write out the mask_table.
+    mask_table = determine_land_blocks_sat(sat, nx, ny, idiv, jdiv, ibuf, jbuf)
+
+    return idiv, jdiv, idiv_io, jdiv_io, mask_table
+
+
+def explore_layouts(mask, nx, ny, ibuf, jbuf, npes_range, target_io_pes=1, sat=None):
+    """Lists all feasible land block elimination layouts for a range of PE counts, along with their
+    load balance metrics. Unlike search_auto_mask_layout, which stops at the first feasible layout,
+    every division count p that leaves at most npes active blocks is reported, so that the PE count
+    giving the best throughput per core-hour can be picked.
+
+    Parameters:
+    -----------
+    mask: 2D numpy array
+        Padded mask array with 1s for ocean cells and 0s for land cells.
+    nx, ny: int
+        Number of cells in x and y direction.
+    ibuf, jbuf: int
+        Buffer widths in x and y direction.
+    npes_range: iterable of int
+        PE counts (NTASKS_OCN) to explore.
+    target_io_pes: int
+        Number of target I/O PEs.
+    sat: 2D numpy array
+        Summed-area table of the mask array, as returned by build_wet_cell_sat, if already built.
+
+    Returns:
+    --------
+    layouts: list of dicts
+        Feasible layouts ranked by their imbalance ratio. Each entry has the keys npes, ndivs, idiv,
+        jdiv, masked_blocks, idiv_io, jdiv_io, max_wet_cells, mean_wet_cells, imbalance,
+        eliminated_frac, and rank.
+    """
+
+    # aspect ratio limit (>1) for a layout to be considered
+    r_extreme = 4.0
+
+    glob_ocn_frac = mask[jbuf : ny + jbuf, ibuf : nx + ibuf].sum() / (ny * nx)
+    if sat is None:
+        sat = build_wet_cell_sat(mask)
+
+    npes_range = list(npes_range)
+    p_ups = [int(np.ceil(npes / glob_ocn_frac)) for npes in npes_range]
+
+    # Layouts of all division counts swept, computed at once, and whether they are considered,
+    # i.e., whether their aspect ratio is not extreme (as in _evaluate_division_count) and their
+    # extents are feasible.
+    p_min = min(npes_range, default=0)
+    p_all = np.arange(p_min, max(p_ups, default=p_min - 1) + 1)
+    idivs, jdivs = MOM_define_layout_batch(nx, ny, p_all)
+    ar = (nx / idivs) / (ny / jdivs)
+    considered = ~((ar * r_extreme < 1.0) | (r_extreme < ar))
+    for n, divs in [(nx, idivs), (ny, jdivs)]:
+        considered[considered] = largest_extent_batch(1, n, divs[considered]) > 0
+    sweep = {
+        int(p): (int(idiv), int(jdiv), bool(c))
+        for p, idiv, jdiv, c in zip(p_all, idivs, jdivs, considered)
+    }
+
+    # land block and interior wet cell counts of each division count, shared by all npes
+    evaluated = {}
+
+    def evaluate(p):
+        if p not in evaluated:
+            idiv, jdiv, is_considered = sweep[p]
+            num_land_blocks = None
+            if is_considered:
+                _, _, num_land_blocks = _evaluate_division_count(
+                    sat, nx, ny, ibuf, jbuf, p, r_extreme, layout=(idiv, jdiv)
+                )
+            wet = None
+            if num_land_blocks is not None:
+                wet = count_block_wet_cells(
+                    sat, nx, ny, idiv, jdiv, ibuf, jbuf, include_halo=False
+                )
+            evaluated[p] = idiv, jdiv, num_land_blocks, wet
+        return evaluated[p]
+
+    layouts = []
+    for npes, p_up in zip(npes_range, p_ups):
+        for p in range(npes, p_up + 1):
+            idiv, jdiv, num_land_blocks, wet = evaluate(p)
+            if num_land_blocks is None or p - num_land_blocks > npes:
+                continue
+
+            # I/O layout with the largest number of I/O PEs not exceeding the target
+            idiv_io, jdiv_io = None, None
+            for nio in range(target_io_pes, 0, -1):
+                if p % nio == 0:
+                    idiv_io_, jdiv_io_ = determine_io_layout(idiv, jdiv, nio)
+                    ar = (idiv / idiv_io_) / (jdiv / jdiv_io_)
+                    if not (ar * r_extreme < 1.0 or r_extreme < ar):
+                        idiv_io, jdiv_io = idiv_io_, jdiv_io_
+                        break
+
+            # exactly npes blocks remain active (see write_auto_mask_file), and all masked
+            # blocks are land blocks, so the wet cells are distributed among npes PEs.
+            max_wet_cells = int(wet.max())
+            mean_wet_cells = float(wet.sum()) / npes
+            layouts.append(
+                {
+                    "npes": npes,
+                    "ndivs": p,
+                    "idiv": idiv,
+                    "jdiv": jdiv,
+                    "masked_blocks": p - npes,
+                    "idiv_io": idiv_io,
+                    "jdiv_io": jdiv_io,
+                    "max_wet_cells": max_wet_cells,
+                    "mean_wet_cells": mean_wet_cells,
+                    "imbalance": max_wet_cells / mean_wet_cells,
+                    "eliminated_frac": (p - npes) / p,
+                }
+            )
+
+    layouts.sort(
+        key=lambda layout: (
+            layout["imbalance"],
+            layout["max_wet_cells"],
+            -layout["npes"],
+        )
+    )
+    for rank, layout in enumerate(layouts, 1):
+        layout["rank"] = rank
+    return layouts
+
+
+def write_layouts_table(layouts, output_path):
+    """Writes the layouts returned by explore_layouts to a CSV or JSON file, depending on the
+    extension of output_path."""
+
+    columns = list(layouts[0].keys()) if layouts else ["rank"]
+    if output_path.endswith(".json"):
+        with open(output_path, "w") as f:
+            json.dump(layouts, f, indent=2)
+    else:
+        with open(output_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(layouts)
+
+    print(f"\t layouts table written to: {output_path}")
 
 
 def determine_io_layout(idiv, jdiv, nio):
@@ -270,9 +817,25 @@ if __name__ == "__main__":
         "-n",
         metavar="npes",
         type=int,
-        required=True,
+        required=False,
         help="Number of MOM6 PEs (NTASKS_OCN)",
     )
+    parser.add_argument(
+        "--explore",
+        metavar="NMIN:NMAX",
+        type=str,
+        required=False,
+        help="List all feasible layouts for the given (inclusive) range of NTASKS_OCN "
+        "instead of generating a mask table",
+    )
+    parser.add_argument(
+        "--table",
+        metavar="table_path",
+        type=str,
+        required=False,
+        help="Path of the CSV (default) or JSON (.json) file to write the explored layouts to "
+        "(default: <output_dir>/MOM_layouts.csv)",
+    )
     parser.add_argument(
         "--tiopes",
         default=1,
@@ -280,6 +843,27 @@ if __name__ == "__main__":
         required=False,
         help="Number of target I/O PEs (NTASKS_IO) (default: 1)",
     )
+    parser.add_argument(
+        "--nworkers",
+        default=1,
+        type=int,
+        required=False,
+        help="Number of processes to search for the layout with (default: 1)",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        default=512,
+        type=int,
+        required=False,
+        help="Number of rows of the topography mask to read at a time (default: 512)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="cache_dir",
+        type=str,
+        required=False,
+        help="Mask table cache directory (default: $MOM6_MASK_TABLE_CACHE_DIR, if set)",
+    )
     parser.add_argument(
         "-rx",
         default=False,
@@ -301,4 +885,34 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     output_dir = args.o or os.getcwd()
-    gen_auto_mask_table(args.t, args.n, args.rx, args.ry, args.tn, output_dir)
+
+    if args.explore:
+        nmin, nmax = (int(n) for n in args.explore.split(":"))
+        mask, nx, ny = read_padded_mask(
+            args.t, args.rx, args.ry, args.tn, chunk_rows=args.chunk_rows
+        )
+        layouts = explore_layouts(
+            mask, nx, ny, 2, 2, range(nmin, nmax + 1), args.tiopes
+        )
+        write_layouts_table(
+            layouts, args.table or os.path.join(output_dir, "MOM_layouts.csv")
+        )
+        raise SystemExit(0)
+
+    if args.n is None:
+        parser.error(
+            "the following arguments are required: -n (unless --explore is used)"
+        )
+
+    gen_auto_mask_table(
+        args.t,
+        args.n,
+        args.rx,
+        args.ry,
+        args.tn,
+        output_dir,
+        tiopes=args.tiopes,
+        nworkers=args.nworkers,
+        chunk_rows=args.chunk_rows,
+        cache_dir=args.cache_dir,
+    )
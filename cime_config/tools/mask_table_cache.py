@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import hashlib
+
+"""Persistent, content-addressed cache of MOM6 land block elimination (mask table) results."""
+
+# Environment variable to set the default cache directory with.
+CACHE_DIR_ENV_VAR = "MOM6_MASK_TABLE_CACHE_DIR"
+
+# Default upper bound of the total size of the cache entries (bytes).
+DEFAULT_MAX_BYTES = 64 * 1024**2
+
+# Incremented whenever the layout search or the format of the cache entries changes, so that
+# entries written by older versions are never reused.
+CACHE_VERSION = 1
+
+
+def file_checksum(file_path, blocksize=2**20):
+    """Returns the SHA-256 checksum of a file.
+
+    Parameters:
+    -----------
+    file_path: str
+        Path to the file.
+    blocksize: int
+        Number of bytes to read at a time.
+    """
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class MaskTableCache:
+    """A directory of mask table results keyed by the checksum of the topography file and the PE
+    configuration (npes, tiopes, reentrant and tripolar flags, halo widths). The total size of
+    the entries is bounded by max_bytes, beyond which the least recently used entries are evicted.
+
+    Parameters:
+    -----------
+    cache_dir: str
+        Cache directory. Created if it doesn't exist.
+    max_bytes: int
+        Upper bound of the total size of the cache entries.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """Returns a MaskTableCache in cache_dir, or in the directory given by the
+        MOM6_MASK_TABLE_CACHE_DIR environment variable. Returns None if neither is set.
+        """
+        cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV_VAR)
+        return cls(cache_dir, max_bytes) if cache_dir else None
+
+    def _topo_checksum(self, topo_file_path):
+        """Returns the checksum of the topography file. Checksums are memoized by file path, size,
+        and modification time, so that large topography files are hashed only once."""
+        stat = os.stat(topo_file_path)
+        memo_path = os.path.join(self.cache_dir, "checksums.json")
+        memo = self._read_json(memo_path) or {}
+        path = os.path.realpath(topo_file_path)
+        if memo.get(path, [None])[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return memo[path][2]
+        checksum = file_checksum(topo_file_path)
+        memo[path] = [stat.st_size, stat.st_mtime_ns, checksum]
+        self._write_json(memo_path, memo)
+        return checksum
+
+    def key(
+        self,
+        topo_file_path,
+        npes,
+        tiopes,
+        reentrant_x,
+        reentrant_y,
+        tripolar_n,
+        ibuf,
+        jbuf,
+    ):
+        """Returns the cache key of a mask table configuration."""
+        fields = [
+            CACHE_VERSION,
+            self._topo_checksum(topo_file_path),
+            npes,
+            tiopes,
+            bool(reentrant_x),
+            bool(reentrant_y),
+            bool(tripolar_n),
+            ibuf,
+            jbuf,
+        ]
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key):
+        """Returns the cached entry (dict) for the given key, or None on a cache miss."""
+        entry_path = self._entry_path(key)
+        entry = self._read_json(entry_path)
+        if entry is not None:
+            os.utime(entry_path)  # mark as recently used
+        return entry
+
+    def put(self, key, entry):
+        """Stores an entry (a JSON serializable dict) and evicts the least recently used entries
+        if the cache exceeds its size limit."""
+        self._write_json(self._entry_path(key), entry)
+        self.evict()
+
+    def evict(self):
+        """Evicts the least recently used entries until the total size of the entries is within
+        the size limit."""
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".json") and filename != "checksums.json":
+                stat = os.stat(os.path.join(self.cache_dir, filename))
+                entries.append((stat.st_mtime_ns, stat.st_size, filename))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, filename))
+            total_bytes -= size
+
+    @staticmethod
+    def _read_json(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def _write_json(path, data):
+        # write to a temporary file first, so that concurrent readers never see partial entries.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import ast
+import json
+import time
+import argparse
+import itertools
+from pathlib import Path
+
+sys.path.append(
+    os.environ.get("CIMEROOT", os.path.join("..", "..", "..", "..", "cime"))
+)
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MOM_RPS")
+)
+
+from FType_MOM_params import FType_MOM_params
+from FType_input_nml import FType_input_nml
+from FType_diag_table import FType_diag_table
+
+descr = """
+Generates the out-of-the-box MOM_input, input.nml, and diag_table files of many configurations at
+once, e.g., to regression-check the default parameters across grids and compsets without
+creating cases. Configurations are given as sets of case variable values: the defaults below,
+updated via --set, combined via --vary, and/or listed in a JSON file via --snapshots. Each
+template is reduced for all the configurations of a grid in a single pass. Requires CIME, which
+is located via the CIMEROOT environment variable.
+"""
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "param_templates", "json"
+)
+
+# The values of the case variables that the templates refer to, for a typical G case.
+DEFAULT_CASE_VARS = {
+    "OCN_GRID": "tx2_3v2",
+    "MOM6_VERTICAL_GRID": "hycom1",
+    "MARBL_CONFIG": "latest",
+    "MARBL_TRACER_OPTS": "",
+    "COMP_ATM": "datm",
+    "COMP_WAV": "swav",
+    "MOM6_WW3_CPL_METHOD": "none",
+    "ROF_GRID": "JRA025",
+    "RUN_TYPE": "startup",
+    "RUN_REFCASE": "case.ref",
+    "RUN_REFDATE": "0001-01-01",
+    "RUN_REFTOD": "00000",
+    "RUN_STARTDATE": "0001-01-01",
+    "CONTINUE_RUN": False,
+    "TEST": False,
+    "CASE": "case",
+    "DIN_LOC_ROOT": "/inputdata",
+    "INST_SUFFIX": "",
+    "NINST_OCN": 1,
+    "NTASKS_OCN": 128,
+    "OCN_NCPL": 24,
+    "NCPL_BASE_PERIOD": "day",
+    "OCN_CO2_TYPE": "constant",
+    "CCSM_CO2_PPMV": 284.7,
+    "ICE_NCAT": 5,
+    "OCN_DIAG_MODE": "production",
+    "OCN_DIAG_SECTIONS": True,
+}
+
+
+def parse_value(val_str):
+    """Parses the value of a case variable given on the command line, e.g., True, 24, or tx2_3v2."""
+    try:
+        return ast.literal_eval(val_str)
+    except (ValueError, SyntaxError):
+        return val_str
+
+
+def expand_func(case_vars, MOM_params=None):
+    """Returns the function to infer the values of expandable variables with from the given case
+    variables and, if provided, MOM6 parameters (as CaseResolver.expand_func does). As in buildnml,
+    the MOM6 parameters are to be those of MOM_input as written, i.e., its written_view, whose
+    values are strings, e.g., "True", as expected by the guards of the templates."""
+
+    def _expand_func(varname):
+        val = case_vars.get(varname)
+        if val is None and MOM_params is not None:
+            entry = MOM_params.get(varname)
+            val = None if entry is None else entry["value"]
+        return val
+
+    return _expand_func
+
+
+def reduce_matrix(snapshots, templates_dir=TEMPLATES_DIR):
+    """Returns the reduced MOM_input, input.nml, and diag_table objects of each of the given
+    configurations (dicts of case variable values), as a list of (MOM_input, input_nml,
+    diag_table) tuples. The shards of the templates are loaded once per grid and
+    reduced for all the configurations of the grid in a single pass (see reduce_many).
+    """
+
+    templates_dir = Path(templates_dir)
+    by_grid = {}
+    for i, case_vars in enumerate(snapshots):
+        by_grid.setdefault(case_vars["OCN_GRID"], []).append(i)
+
+    results = [None] * len(snapshots)
+    for grid, indices in by_grid.items():
+        cases = [snapshots[i] for i in indices]
+
+        def template(ftype, name):
+            return ftype.from_json(templates_dir / f"{name}.json", grid=grid)
+
+        MOM_inputs = template(FType_MOM_params, "MOM_input").reduce_many(
+            [expand_func(case_vars) for case_vars in cases]
+        )
+        input_nmls = template(FType_input_nml, "input_nml").reduce_many(
+            [expand_func(case_vars) for case_vars in cases]
+        )
+        diag_tables = template(FType_diag_table, "diag_table").reduce_many(
+            [
+                expand_func(case_vars, MOM_input.written_view())
+                for case_vars, MOM_input in zip(cases, MOM_inputs)
+            ]
+        )
+        for i, outputs in zip(indices, zip(MOM_inputs, input_nmls, diag_tables)):
+            results[i] = outputs
+    return results
+
+
+def write_outputs(output_dir, label, outputs, casename):
+    """Writes the MOM_input, input.nml, and diag_table of a configuration to output_dir/label, as
+    buildnml writes them to the run directory, i.e., with the casename resolved in diag_table. (The
+    unresolved diag_table is written to diag_table.unresolved, as in Buildconf/momconf.)
+    """
+    MOM_input, input_nml, diag_table = outputs
+    case_dir = os.path.join(output_dir, label)
+    os.makedirs(case_dir, exist_ok=True)
+    MOM_input._publish(
+        os.path.join(case_dir, "MOM_input"), "".join(MOM_input._render_MOM_input())
+    )
+    input_nml.write_nml(os.path.join(case_dir, "input.nml"))
+    unresolved_path = os.path.join(case_dir, "diag_table.unresolved")
+    diag_table.write(unresolved_path, None, MOM_input.written_view())
+    FType_diag_table.resolve(
+        unresolved_path, os.path.join(case_dir, "diag_table"), casename
+    )
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=descr)
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="VAR=VALUE",
+        help="Value of a case variable in all configurations, e.g., OCN_GRID=tx2_3v3.",
+    )
+    parser.add_argument(
+        "--vary",
+        action="append",
+        default=[],
+        metavar="VAR=VALUE1,VALUE2,...",
+        help="Values of a case variable to combine with those of the other --vary options, "
+        "e.g., MOM6_VERTICAL_GRID=hycom1,zstar_65L.",
+    )
+    parser.add_argument(
+        "--snapshots",
+        help="JSON file with a list of configurations, each a dict of case variable values to "
+        "update the defaults (and --set values) with, to be combined with the --vary values.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Directory to write the input files of each configuration to, in subdirectories "
+        "listed in snapshots.json. If not provided, only a summary is printed.",
+    )
+    parser.add_argument(
+        "--templates-dir", default=TEMPLATES_DIR, help="Path to the JSON templates."
+    )
+    args = parser.parse_args()
+
+    base = dict(DEFAULT_CASE_VARS)
+    for assignment in args.set:
+        var, val = assignment.split("=", 1)
+        base[var] = parse_value(val)
+
+    updates = [{}]
+    if args.snapshots is not None:
+        with open(args.snapshots) as f:
+            updates = json.load(f)
+    varied = [assignment.split("=", 1) for assignment in args.vary]
+    snapshots = []
+    for update in updates:
+        for combination in itertools.product(*[vals.split(",") for _, vals in varied]):
+            case_vars = dict(base)
+            case_vars.update(update)
+            for (var, _), val in zip(varied, combination):
+                case_vars[var] = parse_value(val)
+            snapshots.append(case_vars)
+
+    start = time.perf_counter()
+    results = reduce_matrix(snapshots, args.templates_dir)
+    elapsed = time.perf_counter() - start
+
+    labels = [f"config_{i:04d}" for i in range(len(snapshots))]
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        for label, outputs, case_vars in zip(labels, results, snapshots):
+            write_outputs(args.output_dir, label, outputs, case_vars["CASE"])
+        with open(os.path.join(args.output_dir, "snapshots.json"), "w") as f:
+            json.dump(dict(zip(labels, snapshots)), f, indent=3, default=str)
+
+    distinct = len(
+        set("".join(MOM_input._render_MOM_input()) for MOM_input, _, _ in results)
+    )
+    print(
+        f"Reduced the templates for {len(snapshots)} configurations in {elapsed:.2f} s "
+        f"({distinct} distinct MOM_input files)."
+    )
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+
+sys.path.append(
+    os.environ.get("CIMEROOT", os.path.join("..", "..", "..", "..", "cime"))
+)
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MOM_RPS")
+)
+
+from template_cache import load_json
+from template_compiler import TemplateIndex
+
+descr = """
+Lists the entries of the MOM6 input file templates that depend on the given case variables,
+i.e., what may change in MOM_input, input.nml, mom.input_data_list, and diag_table if the
+variables are changed via xmlchange. The entries of the other templates that depend on the MOM6
+parameters affected in MOM_input are listed as well. Requires CIME, which is located via the
+CIMEROOT environment variable.
+"""
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "param_templates", "json"
+)
+TEMPLATES = ["MOM_input", "input_nml", "input_data_list", "diag_table"]
+
+
+def affected_entries(templates_dir, varnames, grid=None):
+    """Returns the entries of the templates in templates_dir (or of their shards for grid, if
+    given) affected by a change of the given case variables, as a dict mapping the template names
+    to lists of (path, variables) pairs, where path is the path of the entry and variables are the
+    (case or MOM6 parameter) variables it depends on among those changed."""
+
+    indices = {
+        name: TemplateIndex(
+            load_json(os.path.join(templates_dir, f"{name}.json"), grid=grid)
+        )
+        for name in TEMPLATES
+    }
+
+    def _affected(index, changed):
+        return [
+            (path, sorted(set(changed) & index.variables_of(path)))
+            for path in index.affected(changed)
+        ]
+
+    affected = {"MOM_input": _affected(indices["MOM_input"], varnames)}
+    # The other templates may also refer to the MOM6 parameters affected in MOM_input.
+    MOM_params = [path[1] for path, _ in affected["MOM_input"] if len(path) > 1]
+    for name in TEMPLATES[1:]:
+        affected[name] = _affected(indices[name], list(varnames) + MOM_params)
+    return affected
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=descr)
+    parser.add_argument(
+        "varnames",
+        nargs="+",
+        help="Case variables to change, e.g., MOM6_VERTICAL_GRID.",
+    )
+    parser.add_argument(
+        "--grid",
+        help="Use the grid shards of the templates for this grid, i.e., list only the entries "
+        "that may change for cases with this OCN_GRID.",
+    )
+    parser.add_argument(
+        "--templates-dir", default=TEMPLATES_DIR, help="Path to the JSON templates."
+    )
+    args = parser.parse_args()
+
+    affected = affected_entries(args.templates_dir, args.varnames, args.grid)
+    for name, entries in affected.items():
+        print(f"{name}: {len(entries)} entries")
+        for path, varnames in entries:
+            print(f"    {'/'.join(path)}  ({', '.join(varnames)})")
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
 import math
+import logging
+import importlib.util
+from functools import lru_cache
 
 """Standalone utility functions for miscellaneous CESM-MOM6 infrastructure/superstructure tasks."""
 
+logger = logging.getLogger(__name__)
+
 
 def MOM_define_layout(isz, jsz, ndivs):
     """This function is a Python implementation of MOM_define_layout subroutine from
@@ -115,3 +120,301 @@ def mpp_compute_extent(isg, ieg, ndivs):
     assert None not in ibegin, "Error in mpp_compute_extent"
     assert None not in iend, "Error in mpp_compute_extent"
     return ibegin, iend
+
+
+@lru_cache(maxsize=4096)
+def cached_MOM_define_layout(isz, jsz, ndivs):
+    """Memoized version of MOM_define_layout, for callers that evaluate the same layouts
+    repeatedly, e.g., layout searches and sweeps."""
+    return MOM_define_layout(isz, jsz, ndivs)
+
+
+@lru_cache(maxsize=4096)
+def cached_mpp_compute_extent(isg, ieg, ndivs):
+    """Memoized version of mpp_compute_extent. The begin and end indices are returned as tuples,
+    so that the cached values cannot be modified by callers. Infeasible extents raise an
+    AssertionError as in mpp_compute_extent (and are not cached)."""
+    ibegin, iend = mpp_compute_extent(isg, ieg, ndivs)
+    return tuple(ibegin), tuple(iend)
+
+
+def MOM_define_layout_batch(isz, jsz, ndivs):
+    """Array version of MOM_define_layout that computes the layouts of many numbers of
+    partitions at once. Requires numpy.
+
+    Parameters:
+    -----------
+    isz: int
+        Global array size in the i-direction
+    jsz: int
+        Global array size in the j-direction
+    ndivs: array_like of int
+        Numbers of partitions
+
+    Returns:
+    --------
+    idiv: numpy array of int
+        Numbers of partitions in the i-direction
+    jdiv: numpy array of int
+        Numbers of partitions in the j-direction
+    """
+    import numpy as np
+
+    ndivs = np.asarray(ndivs, dtype=np.int64)
+    idiv = np.maximum(np.round(np.sqrt((ndivs * isz) / jsz)).astype(np.int64), 1)
+    not_divisor = ndivs % idiv != 0
+    while not_divisor.any():
+        idiv[not_divisor] -= 1
+        not_divisor = ndivs % idiv != 0
+    return idiv, ndivs // idiv
+
+
+def mpp_compute_extent_batch(isg, ieg, ndivs):
+    """Array version of mpp_compute_extent that computes the extents of a domain for many numbers
+    of partitions at once. Instead of raising an AssertionError, infeasible extents are flagged in
+    the returned valid array. Requires numpy.
+
+    Parameters:
+    -----------
+    isg: int
+        Starting index of the domain
+    ieg: int
+        Ending index of the domain
+    ndivs: array_like of int
+        Numbers of partitions along the direction.
+
+    Returns:
+    --------
+    ibegin: 2D numpy array of int
+        Array of shape (len(ndivs), max(ndivs)), where the first ndivs[n] entries of row n are the
+        starting indices of the partitions. Remaining entries are zero.
+    iend: 2D numpy array of int
+        Ending indices of the partitions, laid out as ibegin.
+    valid: 1D numpy array of bool
+        Whether the extents are feasible. Rows of ibegin and iend are meaningful only if valid.
+    """
+    import numpy as np
+
+    ndivs = np.asarray(ndivs, dtype=np.int64).reshape(-1)
+    nbatch = ndivs.size
+    maxdivs = int(ndivs.max()) if nbatch > 0 else 0
+    rows = np.arange(nbatch)
+
+    ibegin = np.zeros((nbatch, maxdivs), dtype=np.int64)
+    iend = np.zeros((nbatch, maxdivs), dtype=np.int64)
+    valid = np.ones(nbatch, dtype=bool)
+
+    n = ieg - isg + 1
+    even_ndivs = ndivs % 2 == 0
+    symmetrize = (
+        (even_ndivs & (n % 2 == 0))
+        | (~even_ndivs & (n % 2 == 1))
+        | (~even_ndivs & (n % 2 == 0) & (ndivs < n / 2))
+    )
+
+    is_ = np.full(nbatch, isg, dtype=np.int64)
+    imax = np.full(nbatch, ieg, dtype=np.int64)
+    ndmax = ndivs.copy()
+
+    for ndiv in range(maxdivs):
+        active = valid & (ndiv < ndivs)
+        bottom = ndiv < (ndivs - 1) // 2 + 1
+
+        # extent computed as in the bottom half (and in the top half if not symmetrized). Float
+        # division and ceil are used as in mpp_compute_extent, so that results are identical.
+        # (The divisor is non-positive only where the extent is retrieved or unused instead.)
+        ndrem = ndmax - ndiv
+        ie = (
+            is_
+            + np.ceil((imax - is_ + 1) / np.where(ndrem > 0, ndrem, 1)).astype(np.int64)
+            - 1
+        )
+
+        # bottom half: mirror extents, the max(,) is to eliminate overlaps
+        ndmirror = (ndivs - 1) - ndiv
+        mirror = active & bottom & (ndmirror > ndiv) & symmetrize
+        mrows, mcols = rows[mirror], ndmirror[mirror]
+        ibegin[mrows, mcols] = np.maximum(isg + ieg - ie[mirror], ie[mirror] + 1)
+        iend[mrows, mcols] = np.maximum(isg + ieg - is_[mirror], ie[mirror] + 1)
+        imax = np.where(mirror, ibegin[rows, np.where(mirror, ndmirror, 0)] - 1, imax)
+        ndmax = np.where(mirror, ndmax - 1, ndmax)
+
+        # top half: retrieve saved values
+        retrieve = active & ~bottom & symmetrize
+        is_ = np.where(retrieve, ibegin[:, ndiv], is_)
+        ie = np.where(retrieve, iend[:, ndiv], ie)
+
+        ibegin[active, ndiv] = is_[active]
+        iend[active, ndiv] = ie[active]
+
+        valid &= ~(active & (ie < is_))
+        valid &= ~(active & (ndiv == ndivs - 1) & (ie != ieg))
+
+        is_ = np.where(active, ie + 1, is_)
+
+    return ibegin, iend, valid
+
+
+def layout_summary(isz, jsz, ndivs):
+    """Returns a summary of the MOM6 domain decomposition of a global array of size (isz x jsz)
+    over ndivs processors, or None if the decomposition is not feasible.
+
+    Parameters:
+    -----------
+    isz: int
+        Global array size in the i-direction
+    jsz: int
+        Global array size in the j-direction
+    ndivs: int
+        Number of partitions
+
+    Returns:
+    --------
+    summary: dict
+        Dictionary with the keys ndivs, idiv, jdiv, block_size (the largest block extents in the
+        i- and j-directions), and aspect_ratio (i-extent over j-extent of the largest block).
+    """
+
+    idiv, jdiv = cached_MOM_define_layout(isz, jsz, ndivs)
+    try:
+        ibegin, iend = cached_mpp_compute_extent(1, isz, idiv)
+        jbegin, jend = cached_mpp_compute_extent(1, jsz, jdiv)
+    except AssertionError:
+        return None
+
+    ni = max(ie - ib + 1 for ib, ie in zip(ibegin, iend))
+    nj = max(je - jb + 1 for jb, je in zip(jbegin, jend))
+    return {
+        "ndivs": ndivs,
+        "idiv": idiv,
+        "jdiv": jdiv,
+        "block_size": (ni, nj),
+        "aspect_ratio": ni / nj,
+    }
+
+
+def largest_extent_batch(isg, ieg, ndivs):
+    """Returns the size of the largest partition of a domain for many numbers of partitions at
+    once, or 0 where the extents are infeasible (see mpp_compute_extent_batch). The extents are
+    computed once per distinct number of partitions, and only if there are no more partitions
+    than cells, which is otherwise infeasible (and would take as many columns of extents).
+    Requires numpy.
+
+    Parameters:
+    -----------
+    isg: int
+        Starting index of the domain
+    ieg: int
+        Ending index of the domain
+    ndivs: array_like of int
+        Numbers of partitions along the direction.
+
+    Returns:
+    --------
+    size: 1D numpy array of int
+        Sizes of the largest partitions.
+    """
+    import numpy as np
+
+    ndivs = np.asarray(ndivs, dtype=np.int64).reshape(-1)
+    unique_divs, inverse = np.unique(ndivs, return_inverse=True)
+    fits = unique_divs <= ieg - isg + 1
+    begin, end, valid = mpp_compute_extent_batch(isg, ieg, unique_divs[fits])
+    size = np.zeros(unique_divs.size, dtype=np.int64)
+    # (the unused entries of the extents are zero, and so have a size of 1)
+    size[fits] = np.where(valid, (end - begin + 1).max(axis=1, initial=1), 0)
+    return size[inverse]
+
+
+def layout_summaries(isz, jsz, ndivs):
+    """Array version of layout_summary that summarizes the MOM6 domain decompositions of many
+    numbers of processors at once. Requires numpy.
+
+    Parameters:
+    -----------
+    isz: int
+        Global array size in the i-direction
+    jsz: int
+        Global array size in the j-direction
+    ndivs: array_like of int
+        Numbers of partitions
+
+    Returns:
+    --------
+    summaries: list
+        Summaries of the decompositions (see layout_summary), or None for the infeasible ones.
+    """
+    import numpy as np
+
+    ndivs = np.asarray(ndivs, dtype=np.int64).reshape(-1)
+    idiv, jdiv = MOM_define_layout_batch(isz, jsz, ndivs)
+    ni = largest_extent_batch(1, isz, idiv)
+    nj = largest_extent_batch(1, jsz, jdiv)
+    return [
+        (
+            {
+                "ndivs": int(ndivs[n]),
+                "idiv": int(idiv[n]),
+                "jdiv": int(jdiv[n]),
+                "block_size": (int(ni[n]), int(nj[n])),
+                "aspect_ratio": int(ni[n]) / int(nj[n]),
+            }
+            if ni[n] > 0 and nj[n] > 0
+            else None
+        )
+        for n in range(ndivs.size)
+    ]
+
+
+def nearby_feasible_layouts(isz, jsz, ndivs, window=None, max_count=6):
+    """Searches a window around ndivs for processor counts with a feasible MOM6 domain
+    decomposition, closest first.
+
+    Parameters:
+    -----------
+    isz: int
+        Global array size in the i-direction
+    jsz: int
+        Global array size in the j-direction
+    ndivs: int
+        Requested number of partitions
+    window: int
+        Largest distance from ndivs to search. Defaults to max(16, ndivs // 4).
+    max_count: int
+        Maximum number of layouts to return.
+
+    Returns:
+    --------
+    layouts: list of dicts
+        Summaries of the feasible layouts (see layout_summary), ordered by distance to ndivs.
+    """
+
+    if window is None:
+        window = max(16, ndivs // 4)
+
+    # numpy is not required by buildnml, whose postchecks call this function.
+    batched = importlib.util.find_spec("numpy") is not None
+    if not batched:
+        logger.warning(
+            "numpy is not available, so nearby layouts are searched one at a time."
+        )
+
+    def summarize(candidates):
+        if batched:
+            return layout_summaries(isz, jsz, candidates)
+        return [layout_summary(isz, jsz, n) for n in candidates]
+
+    # The window is searched in chunks of distances, since the layouts are usually found nearby.
+    chunk = 8
+    layouts = []
+    for first in range(1, window + 1, chunk):
+        candidates = [
+            n
+            for distance in range(first, min(first + chunk, window + 1))
+            for n in (ndivs - distance, ndivs + distance)
+            if n >= 1
+        ]
+        layouts.extend(s for s in summarize(candidates) if s is not None)
+        if len(layouts) >= max_count:
+            break
+    return layouts[:max_count]
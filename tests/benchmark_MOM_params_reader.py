@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+"""Benchmarks the MOM_input syntax reader of FType_MOM_params (used to read MOM_input, MOM_override,
+and user_nl_mom files) on the MOM_input, MOM_override, and MOM_parameter_doc files of the standalone
+benchmark example, or on the files given as arguments. Requires CIME, which is located via the
+CIMEROOT environment variable, e.g.,
+
+    CIMEROOT=/path/to/cesm/cime python tests/benchmark_MOM_params_reader.py
+"""
+
+import os, sys
+import argparse
+import timeit
+
+sys.path.append(os.environ.get("CIMEROOT", os.path.join("..", "..", "cime")))
+sys.path.append(os.path.join("cime_config", "MOM_RPS"))
+sys.path.append(os.path.join("../", "cime_config", "MOM_RPS"))
+
+from FType_MOM_params import FType_MOM_params
+
+BENCHMARK_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "standalone",
+    "examples",
+    "benchmark",
+)
+BENCHMARK_FILES = [
+    "MOM_input",
+    "MOM_override",
+    "MOM_parameter_doc.short",
+    "MOM_parameter_doc.layout",
+    "MOM_parameter_doc.debugging",
+    "MOM_parameter_doc.all",
+]
+
+
+def benchmark(path, repeat):
+    """Returns the number of lines and parameters of the file at path, and the best time (in
+    seconds) to read it in out of the given number of repetitions."""
+    with open(path, "r") as f:
+        nlines = sum(1 for _ in f)
+    data = FType_MOM_params._read_MOM_input(path)
+    nparams = sum(len(params) for params in data.values())
+    number = max(1, 2000 // max(nlines, 1))
+    times = timeit.repeat(
+        lambda: FType_MOM_params._read_MOM_input(path), number=number, repeat=repeat
+    )
+    return nlines, nparams, min(times) / number
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="Files in MOM_input syntax to read. Defaults to the files of the standalone "
+        "benchmark example.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Number of timing repetitions."
+    )
+    args = parser.parse_args()
+
+    files = args.files or [os.path.join(BENCHMARK_DIR, f) for f in BENCHMARK_FILES]
+    print(f"{'file':<32}{'lines':>8}{'params':>8}{'ms/read':>10}{'klines/s':>10}")
+    for path in files:
+        nlines, nparams, t = benchmark(path, args.repeat)
+        print(
+            f"{os.path.basename(path):<32}{nlines:>8}{nparams:>8}{1e3 * t:>10.3f}"
+            f"{nlines / t / 1e3:>10.1f}"
+        )
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+"""Benchmarks the reduction of the parameter templates in param_templates/json with the compiled
+guards of cime_config/MOM_RPS/template_compiler.py against ParamGen.reduce, and checks that both
+produce the same results. Also benchmarks the reduction of the templates for many cases in a
+single pass (reduce_many) against reducing them for each case in turn. Requires CIME, which is located via the CIMEROOT environment variable,
+e.g.,
+
+    CIMEROOT=/path/to/cesm/cime python tests/benchmark_template_reduce.py
+"""
+
+import os, sys
+import argparse
+import itertools
+import json
+import timeit
+from collections import OrderedDict
+from copy import deepcopy
+
+sys.path.append(os.environ.get("CIMEROOT", os.path.join("..", "..", "cime")))
+sys.path.append(os.path.join("cime_config", "MOM_RPS"))
+sys.path.append(os.path.join("../", "cime_config", "MOM_RPS"))
+
+from CIME.ParamGen.paramgen import ParamGen
+from template_compiler import TemplateReducer, reduce_many
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "param_templates", "json"
+)
+TEMPLATES = ["MOM_input", "diag_table", "input_nml", "input_data_list"]
+
+# Values of the expandable variables (case variables and MOM6 parameters) of a typical case.
+CASE_VARS = {
+    "OCN_GRID": "tx2_3v2",
+    "MOM6_VERTICAL_GRID": "hycom1",
+    "MARBL_TRACER_OPTS": "",
+    "MARBL_CONFIG": "off",
+    "COMP_ATM": "datm",
+    "COMP_WAV": "swav",
+    "MOM6_WW3_CPL_METHOD": "none",
+    "ROF_GRID": "JRA025",
+    "RUN_TYPE": "startup",
+    "RUN_REFCASE": "case.ref",
+    "RUN_REFDATE": "0001-01-01",
+    "RUN_REFTOD": "00000",
+    "RUN_STARTDATE": "0001-01-01",
+    "CONTINUE_RUN": False,
+    "TEST": False,
+    "CASE": "case",
+    "DIN_LOC_ROOT": "/inputdata",
+    "INPUTDIR": "/inputdata/ocn/mom/tx2_3v2",
+    "INST_SUFFIX": "",
+    "NINST_OCN": 1,
+    "NTASKS_OCN": 128,
+    "OCN_NCPL": 24,
+    "NCPL_BASE_PERIOD": "day",
+    "OCN_CO2_TYPE": "constant",
+    "CCSM_CO2_PPMV": 284.7,
+    "ICE_NCAT": 5,
+    "OCN_DIAG_MODE": "production",
+    "OCN_DIAG_SECTIONS": True,
+    "USE_CFC_CAP": "False",
+    "DO_GEOTHERMAL": "True",
+    "INIT_LAYERS_FROM_Z_FILE": "True",
+    "TEMP_SALT_Z_INIT_FILE": "woa18_04_initial_conditions.nc",
+}
+
+
+# Values of some of the variables to combine into the cases of the reduce_many benchmark.
+MATRIX_VARS = {
+    "OCN_GRID": ["tx2_3v2", "tx2_3v3", "tx0.25v1", "MISOMIP"],
+    "MOM6_VERTICAL_GRID": ["hycom1", "zstar_65L"],
+    "TEST": [True, False],
+    "OCN_DIAG_MODE": ["spinup", "production", "development"],
+    "COMP_WAV": ["ww3", "swav"],
+    "RUN_TYPE": ["startup", "hybrid"],
+}
+MATRIX_CASES = [
+    dict(CASE_VARS, **dict(zip(MATRIX_VARS, values)))
+    for values in itertools.product(*MATRIX_VARS.values())
+]
+
+
+def reduce_paramgen(data):
+    pg = ParamGen(data)
+    pg.reduce(CASE_VARS.get)
+    return pg.data
+
+
+def reduce_compiled(data):
+    return TemplateReducer(CASE_VARS.get).reduce(data)
+
+
+def reduce_each(data):
+    return [TemplateReducer(case.get).reduce(deepcopy(data)) for case in MATRIX_CASES]
+
+
+def reduce_all(data):
+    return reduce_many(data, [case.get for case in MATRIX_CASES])
+
+
+def benchmark(data, reduce_func, repeat):
+    """Returns the best time (in seconds) to reduce the template data with reduce_func."""
+    copies = [deepcopy(data) for _ in range(repeat)]
+    return min(
+        timeit.repeat(lambda: reduce_func(copies.pop()), number=1, repeat=repeat)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="Number of timing repetitions."
+    )
+    args = parser.parse_args()
+
+    print(f"{'template':<20}{'ParamGen ms':>12}{'compiled ms':>12}{'speedup':>9}")
+    for name in TEMPLATES:
+        with open(os.path.join(TEMPLATES_DIR, name + ".json")) as f:
+            data = json.load(f, object_pairs_hook=OrderedDict)
+        assert reduce_paramgen(deepcopy(data)) == reduce_compiled(
+            deepcopy(data)
+        ), f"Compiled reduction of {name} differs from ParamGen.reduce"
+        t_paramgen = benchmark(data, reduce_paramgen, args.repeat)
+        t_compiled = benchmark(data, reduce_compiled, args.repeat)
+        print(
+            f"{name:<20}{1e3 * t_paramgen:>12.2f}{1e3 * t_compiled:>12.2f}"
+            f"{t_paramgen / t_compiled:>8.1f}x"
+        )
+
+    print(f"\n{len(MATRIX_CASES)} cases:")
+    print(f"{'template':<20}{'each ms':>12}{'many ms':>12}{'speedup':>9}")
+    for name in TEMPLATES:
+        with open(os.path.join(TEMPLATES_DIR, name + ".json")) as f:
+            data = json.load(f, object_pairs_hook=OrderedDict)
+        assert reduce_each(data) == reduce_all(
+            data
+        ), f"reduce_many of {name} differs from reducing it for each case"
+        t_each = min(timeit.repeat(lambda: reduce_each(data), number=1, repeat=3))
+        t_many = min(timeit.repeat(lambda: reduce_all(data), number=1, repeat=3))
+        print(
+            f"{name:<20}{1e3 * t_each:>12.2f}{1e3 * t_many:>12.2f}"
+            f"{t_each / t_many:>8.1f}x"
+        )
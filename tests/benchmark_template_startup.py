@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""Benchmarks the loading of the parameter templates in param_templates/json by the from_json
+methods of the FType_* classes, i.e., via the binary cache of cime_config/MOM_RPS/template_cache.py
+(in a temporary directory, as buildnml does in Buildconf/momconf/template_cache), against parsing
+the templates with ParamGen.from_json. Requires CIME, which is located via the CIMEROOT environment
+variable, e.g.,
+
+    CIMEROOT=/path/to/cesm/cime python tests/benchmark_template_startup.py
+"""
+
+import os, sys
+import argparse
+import tempfile
+import timeit
+
+sys.path.append(os.environ.get("CIMEROOT", os.path.join("..", "..", "cime")))
+sys.path.append(os.path.join("cime_config", "MOM_RPS"))
+sys.path.append(os.path.join("../", "cime_config", "MOM_RPS"))
+
+from CIME.ParamGen.paramgen import ParamGen
+from FType_MOM_params import FType_MOM_params
+from FType_input_nml import FType_input_nml
+from FType_input_data_list import FType_input_data_list
+from FType_diag_table import FType_diag_table
+from template_cache import cache_path
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "param_templates", "json"
+)
+TEMPLATES = [
+    ("MOM_input.json", FType_MOM_params),
+    ("input_nml.json", FType_input_nml),
+    ("input_data_list.json", FType_input_data_list),
+    ("diag_table.json", FType_diag_table),
+]
+
+
+def best(func, repeat):
+    """Returns the best time (in seconds) to call func."""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def benchmark(path, ftype, cache_dir, grid, repeat):
+    """Returns the best times (in seconds) to load the template at path with ParamGen.from_json,
+    with ftype.from_json without a cache file in cache_dir (i.e., including writing it, and
+    generating the shard for grid, if given), and with ftype.from_json from the cache file.
+    """
+
+    def load_cold():
+        os.remove(cache_path(path, cache_dir, grid))
+        ftype.from_json(path, cache_dir=cache_dir, grid=grid)
+
+    ftype.from_json(path, cache_dir=cache_dir, grid=grid)
+    t_json = best(lambda: ParamGen.from_json(path), repeat)
+    t_cold = best(load_cold, repeat)
+    t_warm = best(lambda: ftype.from_json(path, cache_dir=cache_dir, grid=grid), repeat)
+    return t_json, t_cold, t_warm
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--grid",
+        help="Load the shards of the templates for this grid (see "
+        "cime_config/MOM_RPS/template_shards.py), as buildnml does, instead of the templates.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="Number of timing repetitions."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        rows = []
+        for filename, ftype in TEMPLATES:
+            path = os.path.join(TEMPLATES_DIR, filename)
+            times = benchmark(path, ftype, cache_dir, args.grid, args.repeat)
+            rows.append((filename, times))
+        rows.append(("total", [sum(times) for times in zip(*(t for _, t in rows))]))
+
+    print(
+        f"{'template':<24}{'json ms':>10}{'cold ms':>10}{'cached ms':>10}{'speedup':>9}"
+    )
+    for name, (t_json, t_cold, t_warm) in rows:
+        print(
+            f"{name:<24}{1e3 * t_json:>10.2f}{1e3 * t_cold:>10.2f}{1e3 * t_warm:>10.2f}"
+            f"{t_json / t_warm:>8.1f}x"
+        )
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""Checks that buildnml regenerates the MOM6 input files that depend on a case variable when the
+variable is changed, even if the variable is resolved in the grid shards of the templates rather
+than looked up during reduction, e.g., OCN_GRID. buildnml is run twice on a minimal stand-in for a
+CIME case, with the variable changed in between, and the input files are compared against those of
+a fresh case. Requires CIME, which is located via the CIMEROOT environment variable, e.g.,
+
+    CIMEROOT=/path/to/cesm/cime python tests/check_input_manifest.py
+"""
+
+import os, sys
+import filecmp
+import tempfile
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+from pathlib import Path
+
+os.environ.setdefault("CIMEROOT", os.path.join("..", "..", "cime"))
+CIME_CONFIG_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "cime_config"
+)
+sys.path.append(os.path.join(CIME_CONFIG_DIR, "tools"))
+
+from reduce_matrix import DEFAULT_CASE_VARS
+
+# (case variable, initial value, changed value)
+CHANGES = [
+    ("OCN_GRID", "tx2_3v2", "tx0.25v1"),
+    ("MOM6_VERTICAL_GRID", "hycom1", "zstar_65L"),
+]
+OUTPUTS = ["run/MOM_input", "run/input.nml", "run/diag_table"]
+OUTPUTS += ["case/Buildconf/mom.input_data_list"]
+
+
+def load_buildnml():
+    """Imports cime_config/buildnml as a module."""
+    loader = SourceFileLoader("buildnml", os.path.join(CIME_CONFIG_DIR, "buildnml"))
+    module = module_from_spec(spec_from_loader("buildnml", loader))
+    loader.exec_module(module)
+    return module
+
+
+class StandInCase:
+    """The subset of the CIME case interface that buildnml uses, backed by a dict."""
+
+    def __init__(self, values):
+        self._values = dict(values)
+
+    def get_value(self, varname):
+        return self._values.get(varname)
+
+    def set_value(self, varname, value):
+        self._values[varname] = value
+
+    def get_values(self, varname):
+        return None
+
+
+def make_case(case_dir, **case_vars):
+    """Returns a stand-in case in case_dir with the default configuration of reduce_matrix.py,
+    updated with case_vars."""
+    caseroot = Path(case_dir) / "case"
+    rundir = Path(case_dir) / "run"
+    (caseroot / "SourceMods" / "src.mom").mkdir(parents=True)
+    (caseroot / "Buildconf").mkdir()
+    (caseroot / "user_nl_mom").touch()
+    rundir.mkdir()
+    return StandInCase(
+        dict(
+            DEFAULT_CASE_VARS,
+            CASEROOT=str(caseroot),
+            CASEBUILD=str(caseroot / "Buildconf"),
+            RUNDIR=str(rundir),
+            COMP_ROOT_DIR_OCN=os.path.join(CIME_CONFIG_DIR, ".."),
+            SRCROOT=str(case_dir),
+            MOM6_INFRA_API="FMS2",
+            MOM6_OFFLINE_MASKTABLE=False,
+            MARBL_DIAG_MODE="none",
+            CPL_I2O_PER_CAT=False,
+            **case_vars,
+        )
+    )
+
+
+buildnml = load_buildnml()
+for varname, initial, changed in CHANGES:
+    print("Checking ", varname)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        case = make_case(Path(tmp_dir) / "changed", **{varname: initial})
+        buildnml.prep_input(case, [""])
+        case.set_value(varname, changed)
+        buildnml.prep_input(case, [""])
+
+        fresh = make_case(Path(tmp_dir) / "fresh", **{varname: changed})
+        buildnml.prep_input(fresh, [""])
+
+        for output in OUTPUTS:
+            assert filecmp.cmp(
+                Path(tmp_dir) / "changed" / output,
+                Path(tmp_dir) / "fresh" / output,
+                shallow=False,
+            ), f"{output} was not regenerated after changing {varname}."
+    print("PASSED")
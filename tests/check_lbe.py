@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+
+"""Checks that the fast land block elimination routines in cime_config/tools/lbe.py (and the batched
+domain decomposition routines in cime_config/tools/utils.py) produce the same results as their
+reference implementations. Must have the numpy and xarray packages installed.
+"""
+
+import os, sys, tempfile
+import numpy as np
+import xarray as xr
+
+sys.path.append(os.path.join("cime_config", "tools"))
+sys.path.append(os.path.join("../", "cime_config", "tools"))
+
+from utils import (
+    MOM_define_layout,
+    mpp_compute_extent,
+    MOM_define_layout_batch,
+    mpp_compute_extent_batch,
+    layout_summary,
+    layout_summaries,
+)
+from lbe import (
+    determine_land_blocks,
+    build_wet_cell_sat,
+    determine_land_blocks_sat,
+    search_auto_mask_layout,
+    explore_layouts,
+    pad_array,
+    read_padded_mask,
+)
+from halo_cost import halo_exchange_costs
+from mask_table_cache import MaskTableCache
+
+
+def random_mask(nx, ny, ibuf, jbuf, land_frac, rng):
+    """Returns a padded mask with blobs of land cells."""
+    mask = np.zeros((ny + 2 * jbuf, nx + 2 * ibuf))
+    coarse = rng.random((ny // 4 + 1, nx // 4 + 1)) > land_frac
+    mask[jbuf : ny + jbuf, ibuf : nx + ibuf] = np.kron(coarse, np.ones((4, 4)))[
+        :ny, :nx
+    ]
+    return mask
+
+
+def continents_mask(nx, ny, ibuf, jbuf, rng):
+    """Returns a padded mask with a few large land masses."""
+    y, x = np.mgrid[0:ny, 0:nx]
+    field = np.zeros((ny, nx))
+    for _ in range(4):
+        kx, ky, phase = rng.integers(1, 4), rng.integers(1, 3), rng.random() * 2 * np.pi
+        field += np.sin(2 * np.pi * kx * x / nx + phase) * np.cos(np.pi * ky * y / ny)
+    mask = np.zeros((ny + 2 * jbuf, nx + 2 * ibuf))
+    mask[jbuf : ny + jbuf, ibuf : nx + ibuf] = field < 0.5
+    return mask
+
+
+def pad_mask_reference(mask, ibuf, jbuf, reentrant_x, reentrant_y, tripolar_n):
+    """Reference (loop based) implementation of the buffer cell fill of the padded mask."""
+    ny, nx = mask.shape
+    padded = np.zeros((ny + 2 * jbuf, nx + 2 * ibuf))
+    padded[jbuf : ny + jbuf, ibuf : nx + ibuf] = mask
+    if reentrant_x:
+        padded[:, :ibuf] = padded[:, nx : nx + ibuf]
+        padded[:, ibuf + nx :] = padded[:, ibuf : 2 * ibuf]
+    if reentrant_y:
+        padded[:jbuf, :] = padded[ny : ny + jbuf, :]
+        padded[jbuf + ny :, :] = padded[jbuf : 2 * jbuf, :]
+    if tripolar_n:
+        for j in range(jbuf):
+            for i in range(nx + 2 * ibuf):
+                padded[jbuf + ny + j, i] = padded[
+                    jbuf + ny - 1 - j, nx + 2 * ibuf - 1 - i
+                ]
+    return padded
+
+
+def check_batched_layouts():
+    print("Checking MOM_define_layout_batch and mpp_compute_extent_batch")
+    for isg, ieg in [(1, 1), (1, 2), (1, 7), (1, 99), (3, 100), (1, 360), (1, 1080)]:
+        ndivs = np.arange(1, ieg - isg + 20)
+        ibegin, iend, valid = mpp_compute_extent_batch(isg, ieg, ndivs)
+        for n, ib, ie, v in zip(ndivs, ibegin, iend, valid):
+            try:
+                ref = mpp_compute_extent(isg, ieg, int(n))
+            except AssertionError:
+                ref = None
+            assert v == (ref is not None), f"Mismatch for {isg}:{ieg}, {n}"
+            if ref is not None:
+                assert (ib[:n].tolist(), ie[:n].tolist()) == ref
+                assert not ib[n:].any() and not ie[n:].any()
+    for isz, jsz in [(360, 240), (320, 384), (1440, 1080), (7, 1000)]:
+        ndivs = np.arange(1, 2000)
+        idiv, jdiv = MOM_define_layout_batch(isz, jsz, ndivs)
+        for n, i, j in zip(ndivs, idiv, jdiv):
+            assert (i, j) == MOM_define_layout(isz, jsz, int(n)), f"Mismatch for {n}"
+        summaries = layout_summaries(isz, jsz, ndivs)
+        for n, summary in zip(ndivs, summaries):
+            assert summary == layout_summary(isz, jsz, int(n)), f"Mismatch for {n}"
+    print("PASSED")
+
+
+def check_pad_array(rng):
+    print("Checking pad_array")
+    for nx, ny in [(36, 24), (17, 9)]:
+        mask = rng.random((ny, nx))
+        for ibuf, jbuf in [(2, 2), (1, 3), (4, 1)]:
+            for rx in (False, True):
+                for ry in (False, True):
+                    for tn in (False, True):
+                        ref = pad_mask_reference(mask, ibuf, jbuf, rx, ry, tn)
+                        new = pad_array(mask, ibuf, jbuf, rx, ry, tn)
+                        assert (
+                            ref == new
+                        ).all(), f"Mismatch for {nx}x{ny}, {ibuf}, {jbuf}"
+    print("PASSED")
+
+
+def check_read_padded_mask(rng):
+    print("Checking read_padded_mask")
+    nx, ny = 45, 37
+    mask = (rng.random((ny, nx)) > 0.4).astype(np.float64)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        topo_file_path = os.path.join(tmpdir, "topog.nc")
+        xr.Dataset({"mask": (("ny", "nx"), mask)}).to_netcdf(topo_file_path)
+        for rx, ry, tn in [
+            (False, False, False),
+            (True, False, True),
+            (True, True, False),
+        ]:
+            ref = pad_mask_reference(mask, 2, 2, rx, ry, tn)
+            if tn:
+                ref[2 + ny - 1, :] = 1
+            for chunk_rows in [1, 7, 512]:
+                new, nx_, ny_ = read_padded_mask(
+                    topo_file_path, rx, ry, tn, chunk_rows=chunk_rows
+                )
+                assert (nx_, ny_) == (nx, ny)
+                assert new.dtype == np.uint8
+                assert (ref == new).all(), f"Mismatch for chunk_rows={chunk_rows}"
+    print("PASSED")
+
+
+def check_land_blocks(rng):
+    print("Checking determine_land_blocks_sat")
+    for nx, ny in [(36, 24), (90, 64), (100, 17), (57, 113)]:
+        for land_frac in [0.0, 0.3, 0.7, 1.0]:
+            mask = random_mask(nx, ny, 2, 2, land_frac, rng)
+            sat = build_wet_cell_sat(mask.astype(np.uint8))
+            for ndivs in [1, 2, 6, 12, 30, 64]:
+                idiv, jdiv = MOM_define_layout(nx, ny, ndivs)
+                if idiv > nx or jdiv > ny:
+                    continue
+                ref = determine_land_blocks(mask, nx, ny, idiv, jdiv, 2, 2)
+                new = determine_land_blocks_sat(sat, nx, ny, idiv, jdiv, 2, 2)
+                assert ref == new, f"Mismatch for nx={nx}, ny={ny}, ndivs={ndivs}"
+    print("PASSED")
+
+
+def check_parallel_search(rng):
+    print("Checking search_auto_mask_layout with multiple workers")
+    nx, ny = 180, 120
+    mask = continents_mask(nx, ny, 2, 2, rng)
+    for npes, tiopes in [(40, 1), (64, 4), (100, 3)]:
+        serial = search_auto_mask_layout(mask, nx, ny, 2, 2, npes, tiopes, nworkers=1)
+        parallel = search_auto_mask_layout(mask, nx, ny, 2, 2, npes, tiopes, nworkers=3)
+        assert serial == parallel, f"Mismatch for npes={npes}, tiopes={tiopes}"
+    print("PASSED")
+
+
+def check_explore_layouts(rng):
+    print("Checking explore_layouts")
+    nx, ny = 180, 120
+    mask = continents_mask(nx, ny, 2, 2, rng)
+    layouts = explore_layouts(mask, nx, ny, 2, 2, range(40, 61))
+    explored = {(l["npes"], l["idiv"], l["jdiv"]) for l in layouts}
+    for npes in range(40, 61, 5):
+        try:
+            idiv, jdiv, idiv_io, _, _ = search_auto_mask_layout(
+                mask, nx, ny, 2, 2, npes
+            )
+        except RuntimeError:
+            continue  # no land blocks eliminated
+        if idiv_io is None:
+            continue  # no feasible layout found
+        assert (npes, idiv, jdiv) in explored, f"Layout for npes={npes} not explored"
+    assert [l["rank"] for l in layouts] == list(range(1, len(layouts) + 1))
+    assert all(l["imbalance"] >= 1.0 for l in layouts)
+    sat = build_wet_cell_sat(mask)
+    assert explore_layouts(mask, nx, ny, 2, 2, range(40, 61), sat=sat) == layouts
+    print("PASSED")
+
+
+def neighbour_block(i, j, di, dj, idiv, jdiv, reentrant_x, reentrant_y, tripolar_n):
+    """Returns the (0-based) neighbour of block (i, j) at offset (di, dj), or None."""
+    i2, j2 = i + di, j + dj
+    if j2 == jdiv and tripolar_n and not reentrant_y:
+        i2, j2 = idiv - 1 - i2, jdiv - 1
+    if reentrant_x:
+        i2 %= idiv
+    if reentrant_y:
+        j2 %= jdiv
+    if 0 <= i2 < idiv and 0 <= j2 < jdiv:
+        return i2, j2
+    return None
+
+
+def check_halo_exchange_costs(rng):
+    print("Checking halo_exchange_costs")
+    nx, ny, ihalo, jhalo = 60, 48, 4, 3
+    for idiv, jdiv in [(4, 3), (6, 6), (5, 2), (1, 4), (3, 1), (1, 1)]:
+        ibegin, iend = mpp_compute_extent(1, nx, idiv)
+        jbegin, jend = mpp_compute_extent(1, ny, jdiv)
+        random_masked = {
+            (int(i) + 1, int(j) + 1) for i, j in rng.integers(0, (idiv, jdiv), (3, 2))
+        }
+        for masked in (set(), random_masked):
+            for rx, ry, tn in [
+                (False, False, False),
+                (True, False, True),
+                (True, True, False),
+            ]:
+                costs = halo_exchange_costs(
+                    nx, ny, idiv, jdiv, masked, ihalo, jhalo, rx, ry, tn
+                )
+                for i in range(idiv):
+                    for j in range(jdiv):
+                        if (i + 1, j + 1) in masked:
+                            assert costs["neighbours"][i, j] == 0
+                            continue
+                        width = iend[i] - ibegin[i] + 1
+                        height = jend[j] - jbegin[j] + 1
+                        nbrs = 0
+                        cells_in = 0
+                        for di in (-1, 0, 1):
+                            for dj in (-1, 0, 1):
+                                n = neighbour_block(
+                                    i, j, di, dj, idiv, jdiv, rx, ry, tn
+                                )
+                                # (a block that is its own neighbour doesn't exchange its halo)
+                                if (di, dj) == (0, 0) or n is None or n == (i, j):
+                                    continue
+                                if (n[0] + 1, n[1] + 1) in masked:
+                                    continue
+                                nbrs += 1
+                                cells_in += (
+                                    ihalo * height
+                                    if dj == 0
+                                    else jhalo * width if di == 0 else ihalo * jhalo
+                                )
+                        assert costs["neighbours"][i, j] == nbrs
+                        assert costs["bytes"][i, j] == 8 * cells_in
+    print("PASSED")
+
+
+def check_mask_table_cache():
+    print("Checking MaskTableCache")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        topo_file_path = os.path.join(tmpdir, "topog.nc")
+        with open(topo_file_path, "w") as f:
+            f.write("not really a topography file")
+        cache = MaskTableCache(os.path.join(tmpdir, "cache"))
+        keys = [
+            cache.key(topo_file_path, npes, 1, True, False, True, 2, 2)
+            for npes in range(3)
+        ]
+        assert len(set(keys)) == 3
+        for npes, key in enumerate(keys):
+            assert cache.get(key) is None
+            cache.put(key, {"layout": [npes, 1], "io_layout": [1, 1], "mask_table": []})
+            os.utime(cache._entry_path(key), ns=(npes * 10**9, npes * 10**9))
+        assert cache.get(keys[0])["layout"] == [
+            0,
+            1,
+        ]  # now the most recently used entry
+        # shrink the cache to two entries, so the least recently used one is evicted
+        cache.max_bytes = 2 * os.path.getsize(cache._entry_path(keys[0]))
+        cache.evict()
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    print("PASSED")
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    check_batched_layouts()
+    check_pad_array(rng)
+    check_read_padded_mask(rng)
+    check_land_blocks(rng)
+    check_parallel_search(rng)
+    check_explore_layouts(rng)
+    check_halo_exchange_costs(rng)
+    check_mask_table_cache()
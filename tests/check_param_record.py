@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+import os
+import sys
+
+sys.path.append(os.path.join("cime_config", "MOM_RPS"))
+sys.path.append(os.path.join("../", "cime_config", "MOM_RPS"))
+from param_record import ParamRecord, values_equal
+
+# Pairs of parameter values (as written in MOM_input or user_nl_mom, or typed as in the JSON
+# templates), and whether MOM6 reads them as the same value
+CASES = [
+    ("1.0", "1.", True),
+    ("1.5d-3", 0.0015, True),
+    ("1", 1, True),
+    ("True", True, True),
+    (".false.", False, True),
+    ("ocean_topog.nc", '"ocean_topog.nc"', True),
+    ("'ocean_topog.nc'", '"ocean_topog.nc"', True),
+    ("1, 2", "1,2", True),
+    ('"1"', 1, False),
+    ('"1"', "1", False),
+    ('"True"', True, False),
+    ('"1", 2', "1, 2", False),
+    ("1", True, False),
+    ("1.0", "1.5", False),
+]
+
+print("Checking values_equal")
+for val, other, expected in CASES:
+    for make in (
+        lambda v: {"value": v},
+        lambda v: ParamRecord(v),
+    ):
+        for a, b in [(val, other), (other, val)]:
+            assert (
+                values_equal(make(a), make(b)) == expected
+            ), f"values_equal({a!r}, {b!r}) should be {expected}"
+    assert values_equal({"value": val}, ParamRecord(other)) == expected
+print("PASSED")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+"""Checks that cime_config/tools/reduce_matrix.py generates the same MOM_input, input.nml, and
+diag_table files as buildnml, for the default configuration of reduce_matrix.py on a few grids.
+buildnml is run on a minimal stand-in for a CIME case, whose case variables are those of the
+configuration. Requires CIME, which is located via the CIMEROOT environment variable, e.g.,
+
+    CIMEROOT=/path/to/cesm/cime python tests/check_reduce_matrix.py
+"""
+
+import os, sys
+import filecmp
+import tempfile
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+from pathlib import Path
+
+os.environ.setdefault("CIMEROOT", os.path.join("..", "..", "cime"))
+CIME_CONFIG_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "cime_config"
+)
+sys.path.append(os.path.join(CIME_CONFIG_DIR, "tools"))
+
+from reduce_matrix import DEFAULT_CASE_VARS, reduce_matrix, write_outputs
+
+GRIDS = ["tx2_3v2", "tx0.25v1"]
+FILES = ["MOM_input", "input.nml", "diag_table"]
+
+
+def load_buildnml():
+    """Imports cime_config/buildnml as a module."""
+    loader = SourceFileLoader("buildnml", os.path.join(CIME_CONFIG_DIR, "buildnml"))
+    module = module_from_spec(spec_from_loader("buildnml", loader))
+    loader.exec_module(module)
+    return module
+
+
+class StandInCase:
+    """The subset of the CIME case interface that buildnml uses, backed by a dict."""
+
+    def __init__(self, values):
+        self._values = dict(values)
+
+    def get_value(self, varname):
+        return self._values.get(varname)
+
+    def set_value(self, varname, value):
+        self._values[varname] = value
+
+    def get_values(self, varname):
+        return None
+
+
+buildnml = load_buildnml()
+for grid in GRIDS:
+    print("Checking ", grid)
+    case_vars = dict(DEFAULT_CASE_VARS, OCN_GRID=grid)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        caseroot = Path(tmp_dir) / "case"
+        rundir = Path(tmp_dir) / "run"
+        (caseroot / "SourceMods" / "src.mom").mkdir(parents=True)
+        (caseroot / "Buildconf").mkdir()
+        (caseroot / "user_nl_mom").touch()
+        rundir.mkdir()
+        case = StandInCase(case_vars)
+        case._values.update(
+            CASEROOT=str(caseroot),
+            CASEBUILD=str(caseroot / "Buildconf"),
+            RUNDIR=str(rundir),
+            COMP_ROOT_DIR_OCN=os.path.join(CIME_CONFIG_DIR, ".."),
+            SRCROOT=tmp_dir,
+            MOM6_INFRA_API="FMS2",
+            MOM6_OFFLINE_MASKTABLE=False,
+            MARBL_DIAG_MODE="none",
+            CPL_I2O_PER_CAT=False,
+        )
+        buildnml.prep_input(case, [""])
+
+        output_dir = Path(tmp_dir) / "reduce_matrix"
+        (outputs,) = reduce_matrix([case_vars])
+        write_outputs(output_dir, grid, outputs, case_vars["CASE"])
+
+        for filename in FILES:
+            assert filecmp.cmp(
+                rundir / filename, output_dir / grid / filename, shallow=False
+            ), f"{filename} generated by reduce_matrix.py differs from buildnml for {grid}."
+    print("PASSED")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""Checks that the grid shards of the parameter templates in param_templates/json, which buildnml
+generates on first use (see cime_config/MOM_RPS/template_shards.py), reduce to the same as the
+templates themselves, with both ParamGen.reduce and TemplateReducer, for random configurations of
+each grid that the templates refer to and of a grid that they don't. Requires CIME, which is
+located via the CIMEROOT environment variable, e.g.,
+
+    CIMEROOT=/path/to/cesm/cime python tests/check_template_shards.py
+"""
+
+import os, sys
+import copy
+import json
+import random
+
+sys.path.append(os.environ.get("CIMEROOT", os.path.join("..", "..", "cime")))
+sys.path.append(os.path.join("cime_config", "MOM_RPS"))
+sys.path.append(os.path.join("../", "cime_config", "MOM_RPS"))
+
+from CIME.ParamGen.paramgen import ParamGen
+from template_cache import load_json
+from template_compiler import TemplateReducer
+from template_shards import template_grids, shard
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "param_templates", "json"
+)
+TEMPLATES = ["MOM_input", "input_nml", "input_data_list", "diag_table"]
+
+# A grid that the guards of the templates don't compare OCN_GRID with.
+UNLISTED_GRID = "gx1v7"
+
+# Values of the case variables (and MOM6 parameters) that the templates refer to.
+CHOICES = {
+    "MOM6_VERTICAL_GRID": ["zstar_65L", "hycom1", "zstar_75L", "sigma_shelf_zstar"],
+    "MARBL_CONFIG": ["latest", "latest+4p2z", "off"],
+    "MARBL_TRACER_OPTS": ["", "BASE_BIO_ON=TRUE", "ABIO_DIC_ON=TRUE"],
+    "COMP_ATM": ["cam", "datm"],
+    "COMP_WAV": ["ww3", "swav"],
+    "MOM6_WW3_CPL_METHOD": ["most", "legacy", "none"],
+    "ROF_GRID": ["JRA025", "r05", "rx1"],
+    "RUN_TYPE": ["startup", "hybrid", "branch"],
+    "RUN_REFCASE": ["case.ref"],
+    "RUN_REFDATE": ["0001-01-01"],
+    "RUN_REFTOD": ["00000"],
+    "RUN_STARTDATE": ["0001-01-01"],
+    "CONTINUE_RUN": [True, False],
+    "TEST": [True, False],
+    "CASE": ["case"],
+    "DIN_LOC_ROOT": ["/inputdata"],
+    "INST_SUFFIX": ["", "_0001"],
+    "NINST_OCN": [1, 3],
+    "NTASKS_OCN": [128, 36],
+    "OCN_NCPL": [24, 48],
+    "NCPL_BASE_PERIOD": ["day", "hour"],
+    "OCN_CO2_TYPE": ["constant", "prognostic", "diagnostic"],
+    "CCSM_CO2_PPMV": [284.7, 367.0],
+    "ICE_NCAT": [5, 1],
+    "OCN_DIAG_MODE": ["spinup", "production", "development", "none"],
+    "OCN_DIAG_SECTIONS": [True, False],
+    "INPUTDIR": ["/inputdir"],
+    "USE_CFC_CAP": ["True", "False"],
+    "DO_GEOTHERMAL": ["True", "False"],
+    "INIT_LAYERS_FROM_Z_FILE": ["True", "False"],
+    "TEMP_SALT_Z_INIT_FILE": ["ts.nc"],
+}
+SAMPLES = 30
+
+
+def reduced(data, match, case_vars, compiled):
+    """Returns the data reduced for case_vars, or the type of the error raised, if any."""
+    try:
+        if compiled:
+            return json.dumps(TemplateReducer(case_vars.get, match).reduce(data))
+        paramgen = ParamGen(data, match)
+        paramgen.reduce(case_vars.get)
+        return json.dumps(paramgen.data)
+    except Exception as e:
+        return type(e).__name__
+
+
+rng = random.Random(0)
+for name in TEMPLATES:
+    template = load_json(os.path.join(TEMPLATES_DIR, f"{name}.json"))
+    for grid in template_grids(template) + [UNLISTED_GRID]:
+        print("Checking ", name, grid)
+        for match in ("last", "first"):
+            grid_shard = shard(template, grid, match)
+            for _ in range(SAMPLES):
+                case_vars = {var: rng.choice(vals) for var, vals in CHOICES.items()}
+                case_vars["OCN_GRID"] = grid
+                for compiled in (False, True):
+                    expected = reduced(
+                        copy.deepcopy(template), match, case_vars, compiled
+                    )
+                    found = reduced(
+                        copy.deepcopy(grid_shard), match, case_vars, compiled
+                    )
+                    assert found == expected, (
+                        f"The {grid} shard of {name}.json (match={match}) doesn't reduce to "
+                        f"the same as the template for {case_vars}."
+                    )
+        print("PASSED")